@@ -0,0 +1,183 @@
+"""
+Benchmark one alert cycle at scale, without Etherscan or Telegram.
+
+Seeds a throwaway alerts database, serves prices from the local mock oracle,
+runs check_alerts_and_notify with a Bot answered in-process by the shared
+fake Bot API (bench/fake_telegram) and reports cycle wall time,
+upstream requests, DB time, messages/s and peak memory as JSON. Alerts a
+chat fires in the cycle arrive as one digest, so messages_sent counts chats
+(plus any split parts), not alerts.
+
+    python -m bench.alert_pipeline --alerts-per-chain 20000 --distribution lognormal
+    python -m bench.alert_pipeline --output bench_results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from bench.fake_telegram import FakeBotApi, StubRequest
+from bench.mock_oracle import MockGasOracle
+
+
+def thresholds(distribution: str, count: int, price: float, rng: random.Random):
+    """Alert thresholds centred on the current price"""
+    if distribution == "uniform":
+        return [round(rng.uniform(price * 0.1, price * 2), 3) for _ in range(count)]
+    if distribution == "normal":
+        return [round(max(0.001, rng.gauss(price, price * 0.3)), 3) for _ in range(count)]
+    if distribution == "lognormal":
+        return [round(rng.lognormvariate(0, 0.6) * price, 3) for _ in range(count)]
+    raise ValueError(distribution)
+
+
+class Timer:
+    """Accumulates time spent in wrapped functions"""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+
+    def wrap(self, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.seconds += time.perf_counter() - start
+                self.calls += 1
+        return timed
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--alerts-per-chain", type=int, default=10000)
+    parser.add_argument("--chains", help="comma-separated chain keys (default: every chain in the registry)")
+    parser.add_argument("--chats", type=int, default=5000, help="distinct chats owning the alerts")
+    parser.add_argument("--distribution", choices=["uniform", "normal", "lognormal"], default="uniform")
+    parser.add_argument("--price", type=float, default=10.0, help="mock gas price (Gwei) for every chain")
+    parser.add_argument("--oracle-latency", type=float, default=0.0, help="seconds per oracle request")
+    parser.add_argument("--send-latency", type=float, default=0.0, help="seconds per fake send_message")
+    parser.add_argument("--global-rate", type=float, default=None,
+                        help="messages/s limit for the dispatcher (default: bot setting)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    # Prices are filled in from the chain registry once config has been set up
+    oracle = MockGasOracle(latency=args.oracle_latency).start()
+
+    # Configure the bot before any of its modules read config
+    os.environ.update(
+        TELEGRAM_BOT_TOKEN="123456:bench",
+        ETHERSCAN_API_KEY="bench",
+        ETHERSCAN_API_URL=oracle.url,
+        ETHERSCAN_KEY_RATE_PER_SECOND="1000",
+        GAS_PROVIDERS="etherscan",
+        ALERTS_DB_PATH=os.path.join(tempfile.mkdtemp(), "alerts.db"),
+    )
+    from data.db import init_db
+    from data.repository import alerts_repo
+    from core.alert_index import alert_index
+    from core.alert_manager import check_alerts_and_notify
+    from core.delivery_state import delivery_state
+    from core.notifier import NotificationDispatcher, GLOBAL_RATE
+    from telegram import Bot
+    from config.chains import chains as chain_registry
+
+    chains = [c.strip() for c in args.chains.split(",") if c.strip()] if args.chains else chain_registry.keys()
+    for chain in chains:
+        if chain not in chain_registry:
+            raise SystemExit(f"Unknown chain {chain}; known: {', '.join(chain_registry.keys())}")
+        oracle.prices[chain_registry.get(chain).id] = args.price
+
+    init_db()
+    rng = random.Random(args.seed)
+    rows = []
+    for chain in chains:
+        for threshold in thresholds(args.distribution, args.alerts_per_chain, args.price, rng):
+            chat_id = rng.randrange(1, args.chats + 1)
+            rows.append((chat_id, chat_id, chain, threshold))
+    with alerts_repo.conn as conn:
+        conn.executemany(
+            "INSERT INTO alerts (user_id, chat_id, chain, threshold, notified) VALUES (?, ?, ?, ?, 0)", rows
+        )
+    expected = sum(1 for row in rows if row[3] >= args.price)
+
+    db_timer = Timer()
+    alerts_repo.claim_alerts = db_timer.wrap(alerts_repo.claim_alerts)
+    alerts_repo.get_armed_alerts = db_timer.wrap(alerts_repo.get_armed_alerts)
+    delivery_state.flush = db_timer.wrap(delivery_state.flush)
+
+    async def run():
+        api = FakeBotApi()
+        bot = Bot("123456:bench", request=StubRequest(api, args.send_latency))
+        await bot.initialize()
+        dispatcher = NotificationDispatcher(global_rate=args.global_rate or GLOBAL_RATE)
+        await dispatcher.start(bot)
+        delivery_state.start()
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        alert_index.load()
+        loaded = time.perf_counter()
+        stats = await asyncio.to_thread(check_alerts_and_notify, dispatcher)
+        evaluated = time.perf_counter()
+        await asyncio.sleep(0)
+        await dispatcher.queue.join()
+        delivered = time.perf_counter()
+        await asyncio.to_thread(delivery_state.stop)
+        finished = time.perf_counter()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        await dispatcher.stop()
+        await bot.shutdown()
+
+        messages = api.sent("sendMessage")
+        sent = len(messages)
+        return {
+            "version": git_revision(),
+            "params": vars(args),
+            "alerts_seeded": len(rows),
+            "alerts_expected_to_fire": expected,
+            "messages_sent": sent,
+            "cycle_messages_reported": stats["messages"],
+            "longest_message_chars": max((len(params["text"]) for _, _, params in messages), default=0),
+            "upstream_requests": oracle.requests,
+            "cycle_requests_reported": stats["requests"],
+            "index_load_s": round(loaded - started, 4),
+            "evaluation_s": round(evaluated - loaded, 4),
+            "delivery_s": round(delivered - evaluated, 4),
+            "cycle_wall_s": round(finished - started, 4),
+            "db_time_s": round(db_timer.seconds, 4),
+            "db_calls": db_timer.calls,
+            "messages_per_s": round(sent / (delivered - loaded), 1) if sent else 0.0,
+            "peak_traced_mb": round(peak / 2 ** 20, 2),
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        oracle.stop()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
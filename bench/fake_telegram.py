@@ -0,0 +1,179 @@
+"""
+A minimal stand-in for the Telegram Bot API, for benchmarks and harnesses.
+
+Run the bot with TELEGRAM_API_BASE_URL=http://127.0.0.1:<port>/bot and every
+API call lands here. Outgoing messages are recorded with a timestamp, and
+synthetic updates can be fed to a polling bot through getUpdates.
+StubRequest plugs the same fake into an in-process Application, with no HTTP.
+"""
+import asyncio
+import json
+import queue
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs
+from telegram.request import BaseRequest
+
+
+def _decode(value: str):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+class FakeBotApi:
+    """Answers Bot API methods with canned results and records every call"""
+
+    def __init__(self):
+        self.updates = queue.Queue()
+        self.calls = []           # (timestamp, method, params)
+        self.listeners = []       # called with (timestamp, method, params)
+        self._lock = threading.Lock()
+        self._message_id = 0
+
+    def handle(self, method: str, params: dict):
+        now = time.perf_counter()
+        with self._lock:
+            self.calls.append((now, method, params))
+        for listener in self.listeners:
+            listener(now, method, params)
+
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        if method == "getUpdates":
+            return self._get_updates(float(params.get("timeout") or 0))
+        if method in ("sendMessage", "editMessageText"):
+            with self._lock:
+                self._message_id += 1
+                message_id = self._message_id
+            return {
+                "message_id": params.get("message_id") or message_id,
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id") or 0), "type": "private"},
+                "text": params.get("text", ""),
+            }
+        return True
+
+    def _get_updates(self, timeout: float):
+        batch = []
+        try:
+            batch.append(self.updates.get(timeout=min(timeout, 1.0)))
+            while len(batch) < 100:
+                batch.append(self.updates.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def sent(self, method: str = None):
+        with self._lock:
+            return [c for c in self.calls if method is None or c[1] == method]
+
+
+class FakeTelegramServer(FakeBotApi):
+    """FakeBotApi served over HTTP from a background thread"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        super().__init__()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode() if length else ""
+                if self.headers.get("Content-Type", "").startswith("application/json"):
+                    params = json.loads(body or "{}")
+                else:
+                    params = {k: _decode(v[0]) for k, v in parse_qs(body).items()}
+                method = self.path.rsplit("/", 1)[-1]
+                result = server.handle(method, params)
+                payload = json.dumps({"ok": True, "result": result}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                try:
+                    self.wfile.write(payload)
+                except BrokenPipeError:
+                    pass  # the bot went away mid long-poll
+
+            do_GET = do_POST
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.base_url = f"http://{host}:{self.port}/bot"
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class StubRequest(BaseRequest):
+    """In-process Bot transport: every API call is answered by a FakeBotApi"""
+
+    def __init__(self, api: FakeBotApi, latency: float = 0.0):
+        self.api = api
+        self.latency = latency
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        params = request_data.parameters if request_data else {}
+        result = self.api.handle(url.rsplit("/", 1)[-1], params)
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+def command_update(update_id: int, chat_id: int, text: str) -> dict:
+    """A synthetic Update carrying a text message"""
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": f"user{chat_id}"},
+        "text": text,
+    }
+    if text.startswith("/"):
+        command = text.split()[0]
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+    return {"update_id": update_id, "message": message}
+
+
+def callback_update(update_id: int, chat_id: int, data: str) -> dict:
+    """A synthetic Update carrying an inline-button press"""
+    user = {"id": chat_id, "is_bot": False, "first_name": f"user{chat_id}"}
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": user,
+            "chat_instance": str(chat_id),
+            "data": data,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": 1, "is_bot": True, "first_name": "Bench"},
+                "text": "menu",
+            },
+        },
+    }
@@ -0,0 +1,145 @@
+"""
+Load-test the Telegram handlers through the real Application.
+
+Builds synthetic Updates (commands, callback queries such as refresh and
+delete_alert_<id>, and threshold text messages), feeds them to an Application
+running the bot's own handlers via process_update, with a stubbed Bot
+transport and a stub gas source. Reports p50/p95/p99 handler latency and
+updates/s, overall and per update kind.
+
+    python -m bench.handler_load --users 2000 --concurrency 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from bench.fake_telegram import FakeBotApi, StubRequest, command_update, callback_update
+
+# Scenarios a synthetic user runs on a chain; each is a list of (kind, update factory)
+SCENARIOS = {
+    "status": lambda u, ids, chain: [("/status", lambda i: command_update(i, u, "/status"))],
+    "myalerts": lambda u, ids, chain: [("/myalerts", lambda i: command_update(i, u, "/myalerts"))],
+    "track": lambda u, ids, chain: [
+        ("track_gas", lambda i: callback_update(i, u, f"{chain}_track_gas")),
+        ("refresh", lambda i: callback_update(i, u, "refresh")),
+    ],
+    "my_alerts_button": lambda u, ids, chain: [("my_alerts", lambda i: callback_update(i, u, "my_alerts"))],
+    "delete": lambda u, ids, chain: [
+        ("delete_alert", lambda i: callback_update(i, u, f"delete_alert_{ids.get(u, 0)}")),
+    ],
+    "set_alert": lambda u, ids, chain: [
+        ("setalert", lambda i: callback_update(i, u, f"setalert_{chain}")),
+        ("threshold_text", lambda i: command_update(i, u, "5.5")),
+    ],
+}
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def summarize(latencies, elapsed=None):
+    result = {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+    if elapsed:
+        result["updates_per_s"] = round(len(latencies) / elapsed, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100, help="users clicking at the same time")
+    parser.add_argument("--gas-latency", type=float, default=0.05, help="seconds per stub gas fetch")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="seconds per Bot API call")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    os.environ.update(
+        TELEGRAM_BOT_TOKEN="123456:bench",
+        ETHERSCAN_API_KEY="bench",
+        ALERTS_DB_PATH=os.path.join(tempfile.mkdtemp(), "alerts.db"),
+    )
+    from telegram import Update
+    from telegram.ext import ApplicationBuilder
+    from bot.command import register_handlers
+    from core.alert_index import alert_index
+    from core.gas_cache import gas_cache
+    from core.providers import StubProvider
+    from data.db import init_db
+    from data.repository import alerts_repo
+    from config.chains import chains
+
+    init_db()
+    alert_index.load()
+    chain_keys = chains.keys()
+    stub = StubProvider({chain.id: 10.0 for chain in chains}, delay=args.gas_latency)
+    gas_cache.fetcher = stub.fetch
+    gas_cache.async_fetcher = stub.afetch
+
+    rng = random.Random(args.seed)
+    users = list(range(100_000, 100_000 + args.users))
+    # Every user starts with a couple of alerts so /myalerts and delete have work to do
+    alert_ids = {}
+    for user in users:
+        for threshold in (3.0, 7.5):
+            alert_ids[user] = alerts_repo.add_alert(user, user, rng.choice(chain_keys), threshold)
+
+    api = FakeBotApi()
+    app = (
+        ApplicationBuilder()
+        .token("123456:bench")
+        .request(StubRequest(api, args.api_latency))
+        .get_updates_request(StubRequest(api))
+        .concurrent_updates(args.concurrency)
+        .build()
+    )
+    register_handlers(app)
+
+    async def run():
+        await app.initialize()
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies = {}
+        next_id = iter(range(1, 10 ** 9))
+
+        async def user_session(user):
+            scenario = SCENARIOS[rng.choice(list(SCENARIOS))](user, alert_ids, rng.choice(chain_keys))
+            async with semaphore:
+                for kind, factory in scenario:
+                    update = Update.de_json(factory(next(next_id)), app.bot)
+                    start = time.perf_counter()
+                    await app.process_update(update)
+                    latencies.setdefault(kind, []).append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user_session(user) for user in users))
+        elapsed = time.perf_counter() - started
+        await app.shutdown()
+        return latencies, elapsed
+
+    latencies, elapsed = asyncio.run(run())
+    every = [ms for values in latencies.values() for ms in values]
+    results = {
+        "params": vars(args),
+        "overall": summarize(every, elapsed),
+        "by_kind": {kind: summarize(values) for kind, values in sorted(latencies.items())},
+        "gas_fetches": stub.calls,
+        "api_calls": len(api.calls),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
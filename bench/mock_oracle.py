@@ -0,0 +1,63 @@
+"""
+Local stand-in for the Etherscan v2 gas oracle.
+
+Point the bot at it with ETHERSCAN_API_URL=http://127.0.0.1:<port>/v2/api.
+Prices are set per chain id and every request is counted.
+"""
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+class MockGasOracle:
+    def __init__(self, prices: dict = None, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.prices = dict(prices or {})
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        oracle = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                payload = json.dumps(oracle.respond(params)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}/v2/api"
+
+    def respond(self, params: dict) -> dict:
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        price = self.prices.get(int(params.get("chainid", 0)))
+        if price is None:
+            return {"status": "0", "message": "NOTOK", "result": "Unsupported chain"}
+        return {
+            "status": "1",
+            "message": "OK",
+            "result": {
+                "SafeGasPrice": str(price),
+                "ProposeGasPrice": str(round(price * 1.1, 6)),
+                "FastGasPrice": str(round(price * 1.3, 6)),
+            },
+        }
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
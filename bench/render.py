@@ -0,0 +1,74 @@
+"""
+Micro-benchmark of the message render path.
+
+Times building the chain keyboards per press (the old behaviour) against the
+prebuilt ones, and formatting the chain and /status messages from scratch
+against the snapshot-keyed render cache, for many users viewing the same
+snapshot. Reports microseconds per call.
+
+    python -m bench.render --iterations 100000
+"""
+import argparse
+import json
+import time
+from telegram import InlineKeyboardMarkup, InlineKeyboardButton
+from config.chains import chains
+from core.gas_cache import GasSnapshot
+from bot.command import (
+    GAS_CHAIN_KEYBOARD, format_gas_fee_message, render_gas_fee_message, format_status_message,
+)
+from bot.render_cache import render_cache
+
+
+def build_chain_keyboard():
+    """What gas_chain_keyboard() did on every button press"""
+    buttons = [InlineKeyboardButton(f"{chain.emoji} {chain.name}", callback_data=f"{chain.key}_track_gas")
+               for chain in chains]
+    rows = [buttons[i:i + 2] for i in range(0, len(buttons), 2)]
+    rows.append([InlineKeyboardButton("🔙 Back to Menu", callback_data="back_to_menu")])
+    return InlineKeyboardMarkup(rows)
+
+
+def per_call_us(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return round((time.perf_counter() - start) / iterations * 1e6, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+    n = args.iterations
+
+    now = time.time()
+    snapshots = {chain.key: GasSnapshot(chain.id, 0.8, 1.2, 3.5, now) for chain in chains}
+    chain_keys = chains.keys()
+    results = tuple(snapshots[key] for key in chain_keys)
+    eth = snapshots["eth"]
+    render_cache.clear()
+
+    timings = {
+        "keyboard_build": per_call_us(build_chain_keyboard, n),
+        "keyboard_prebuilt": per_call_us(lambda: GAS_CHAIN_KEYBOARD, n),
+        "chain_message_format": per_call_us(lambda: format_gas_fee_message("eth", eth), n),
+        "chain_message_cached": per_call_us(lambda: render_gas_fee_message("eth", eth), n),
+        "status_message_format": per_call_us(lambda: format_status_message(chain_keys, results), n),
+        "status_message_cached": per_call_us(
+            lambda: render_cache.get("status", results, lambda: format_status_message(chain_keys, results)), n),
+    }
+    results = {
+        "params": vars(args),
+        "us_per_call": timings,
+        "render_cache": render_cache.stats(),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Measure cold vs warm restarts.
+
+Runs main.py twice against a fake Bot API and a slow mock gas oracle, sharing
+one database and warm state file. Each run sends /status as soon as the bot
+is polling and times the reply; the first run starts cold, the second from
+the state the first saved at shutdown. Reports the bot's own startup phase
+timings alongside.
+
+    python -m bench.warm_start --oracle-latency 0.5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from bench.fake_telegram import FakeTelegramServer, command_update
+from bench.mock_oracle import MockGasOracle
+from bench.webhook_harness import wait_until
+from config.chains import chains
+
+
+def run_once(api, oracle, env, log_path, update_id):
+    replies = []
+    listener = lambda ts, method, params: method == "sendMessage" and replies.append(ts)
+    api.listeners.append(listener)
+    requests_before = oracle.requests
+    polls_before = len(api.sent("getUpdates"))
+    spawned = time.perf_counter()
+    with open(log_path, "w") as log:
+        bot = subprocess.Popen([sys.executable, "main.py"], env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        if not wait_until(lambda: len(api.sent("getUpdates")) > polls_before, 30):
+            raise SystemExit("Bot did not start")
+        ready = time.perf_counter()
+        sent = time.perf_counter()
+        api.updates.put(command_update(update_id, 42, "/status"))
+        wait_until(lambda: replies, 30)
+    finally:
+        bot.terminate()
+        bot.wait(timeout=15)
+        api.listeners.remove(listener)
+
+    timings = {}
+    with open(log_path) as log:
+        for line in log:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("msg", "").startswith("🚀 Startup timings"):
+                timings = {k: v for k, v in entry.items() if k not in ("ts", "level", "logger", "msg")}
+    return {
+        "spawn_to_polling_ms": round((ready - spawned) * 1000, 1),
+        "first_status_reply_ms": round((replies[0] - sent) * 1000, 1) if replies else None,
+        "oracle_requests_before_reply": oracle.requests - requests_before,
+        "startup_phases_ms": timings,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--oracle-latency", type=float, default=0.5, help="seconds per oracle request")
+    parser.add_argument("--price", type=float, default=10.0, help="mock gas price (Gwei) for every registry chain")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    api = FakeTelegramServer().start()
+    oracle = MockGasOracle({chain.id: args.price for chain in chains}, latency=args.oracle_latency).start()
+    workdir = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        TELEGRAM_BOT_TOKEN="123456:bench",
+        ETHERSCAN_API_KEY="bench",
+        ETHERSCAN_API_URL=oracle.url,
+        GAS_PROVIDERS="etherscan",
+        TELEGRAM_API_BASE_URL=api.base_url,
+        ALERTS_DB_PATH=os.path.join(workdir, "alerts.db"),
+        WARM_STATE_PATH=os.path.join(workdir, "warm_state.json"),
+        LOG_FORMAT="json",
+    )
+    try:
+        cold = run_once(api, oracle, env, os.path.join(workdir, "cold.log"), 1)
+        warm = run_once(api, oracle, env, os.path.join(workdir, "warm.log"), 2)
+    finally:
+        api.stop()
+        oracle.stop()
+
+    results = {"params": vars(args), "cold": cold, "warm": warm}
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
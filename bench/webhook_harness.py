@@ -0,0 +1,119 @@
+"""
+Measure update-to-reply latency in webhook and polling mode.
+
+Starts a fake Bot API server, runs main.py against it in the chosen mode,
+feeds it synthetic /help updates (POSTed to the webhook, or served through
+getUpdates when polling) and times each until the bot's sendMessage reply
+arrives at the fake API.
+
+    python -m bench.webhook_harness --mode webhook --updates 200
+    python -m bench.webhook_harness --mode polling --updates 200
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from bench.fake_telegram import FakeTelegramServer, command_update
+
+WEBHOOK_PORT = 8787
+SECRET = "bench-secret"
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def wait_until(predicate, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=["webhook", "polling"], default="webhook")
+    parser.add_argument("--updates", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=50, help="updates sent per second")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    api = FakeTelegramServer().start()
+    replies = {}
+    api.listeners.append(
+        lambda ts, method, params: method == "sendMessage" and replies.setdefault(int(params["chat_id"]), ts)
+    )
+
+    workdir = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        TELEGRAM_BOT_TOKEN="123456:bench",
+        ETHERSCAN_API_KEY=os.environ.get("ETHERSCAN_API_KEY", "bench"),
+        TELEGRAM_API_BASE_URL=api.base_url,
+        ALERTS_DB_PATH=os.path.join(workdir, "alerts.db"),
+        # Keep the bot's shutdown save out of the repository's data/ directory
+        WARM_STATE_PATH=os.path.join(workdir, "warm_state.json"),
+        WEBHOOK_SECRET=SECRET,
+    )
+    command = [sys.executable, "main.py"]
+    if args.mode == "webhook":
+        command += ["--webhook", "--listen", "127.0.0.1", "--port", str(WEBHOOK_PORT),
+                    "--url", f"http://127.0.0.1:{WEBHOOK_PORT}"]
+    bot = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    try:
+        ready_method = "setWebhook" if args.mode == "webhook" else "getUpdates"
+        if not wait_until(lambda: api.sent(ready_method), 30):
+            raise SystemExit("Bot did not start")
+        time.sleep(0.5)
+
+        sent_at = {}
+        client = httpx.Client()
+        for i in range(args.updates):
+            chat_id = 10_000 + i
+            update = command_update(i + 1, chat_id, "/help")
+            sent_at[chat_id] = time.perf_counter()
+            if args.mode == "webhook":
+                client.post(
+                    f"http://127.0.0.1:{WEBHOOK_PORT}/telegram",
+                    content=json.dumps(update),
+                    headers={"Content-Type": "application/json", "X-Telegram-Bot-Api-Secret-Token": SECRET},
+                )
+            else:
+                api.updates.put(update)
+            time.sleep(1 / args.rate)
+
+        wait_until(lambda: len(replies) >= args.updates, 30)
+        latencies = [(replies[c] - t) * 1000 for c, t in sent_at.items() if c in replies]
+    finally:
+        bot.terminate()
+        bot.wait(timeout=15)
+        api.stop()
+
+    if not latencies:
+        raise SystemExit("No replies received")
+    results = {
+        "mode": args.mode,
+        "updates": args.updates,
+        "replies": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "mean_ms": round(statistics.mean(latencies), 2),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
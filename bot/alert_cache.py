@@ -0,0 +1,121 @@
+import threading
+from bisect import insort
+from collections import OrderedDict
+from config.api_keys import config
+from core import metrics
+
+# Most users whose armed alerts (and rendered /myalerts view) are kept in memory
+USER_ALERT_CACHE_SIZE = int(config.get("USER_ALERT_CACHE_SIZE") or 10000)
+
+_lookups = metrics.Counter("gasbot_user_alert_cache_lookups_total", "/myalerts cache lookups", ("result",))
+
+
+def _sort_key(row):
+    return row[1], row[2]  # same order as AlertRepository.get_user_alerts
+
+
+class _Entry:
+    __slots__ = ("rows", "view")
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.view = None
+
+
+class UserAlertCache:
+    """
+    Bounded LRU of each user's armed alerts, as (id, chain, threshold, notified)
+    rows, plus the /myalerts view rendered from them.
+
+    Registered as an alert index listener, so every write - a new alert from
+    handle_gwei_input, delete_alert, a trigger in the alert cycle or a re-arm
+    after a failed send - updates the cached rows in place and drops the
+    rendered view. A repeat view needs no database round-trip.
+    """
+
+    def __init__(self, max_users: int = USER_ALERT_CACHE_SIZE):
+        self.max_users = max_users
+        self._entries = OrderedDict()  # user_id -> _Entry
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int):
+        """Return the cached entry for a user, or None"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                _lookups.inc(result="miss")
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+        _lookups.inc(result="hit")
+        return entry
+
+    def write_token(self) -> int:
+        """Take before reading from the database; pass to fill()"""
+        return self._writes
+
+    def fill(self, user_id: int, rows, token: int):
+        """
+        Cache rows read from the database. Skipped if any alert changed since
+        token was taken, as the rows may already be out of date.
+        """
+        entry = _Entry(sorted(rows, key=_sort_key))
+        with self._lock:
+            if token != self._writes:
+                return entry
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return entry
+
+    def view(self, entry: _Entry, render):
+        """Rendered view for an entry, built by render(rows) at most once per change"""
+        view = entry.view
+        if view is None:
+            rows = entry.rows
+            view = render(rows)
+            with self._lock:
+                if entry.rows is rows:
+                    entry.view = view
+        return view
+
+    def on_index_change(self, event: str, alert):
+        """Alert index listener: write the change through to the user's cached rows"""
+        with self._lock:
+            self._writes += 1
+            entry = self._entries.get(alert.user_id)
+            if entry is None:
+                return
+            rows = [row for row in entry.rows if row[0] != alert.id]
+            if event == "add":
+                insort(rows, (alert.id, alert.chain, alert.threshold, 0), key=_sort_key)
+            entry.rows = rows
+            entry.view = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._writes += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "users": len(self._entries),
+            "max_users": self.max_users,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+user_alert_cache = UserAlertCache()
+
+metrics.Gauge("gasbot_user_alert_cache_users", "Users with cached alerts", function=lambda: len(user_alert_cache))
@@ -1,7 +1,52 @@
+import asyncio
 from telegram.ext import ApplicationBuilder, Application
 from config.api_keys import config
 from bot.command import register_handlers
+from core.gas_tracker import close_async_client
+from core.notifier import notification_dispatcher
+from core.delivery_state import delivery_state
+from data.history import gas_history
+from core.scheduler import start_scheduler
+from core.warm_state import save_state, startup_timer
+from core.stream import stream_evaluator, configured_sources
+from core.sharding import shard_coordinator
 
-bot = ApplicationBuilder().token(config["TELEGRAM_BOT_TOKEN"]).build()
+async def on_startup(app: Application):
+    delivery_state.start()
+    await notification_dispatcher.start(app.bot)
+    # Optional streaming mode; the scheduler keeps polling as a fallback
+    stream_evaluator.start(configured_sources())
+    start_scheduler(app)
+    startup_timer.mark("ready")
+    startup_timer.report()
+
+async def on_shutdown(app: Application):
+    await stream_evaluator.stop()
+    # Give queued alerts a chance to go out; whatever is left is re-armed by stop()
+    await notification_dispatcher.drain()
+    await notification_dispatcher.stop()
+    delivery_state.stop()
+    gas_history.stop()
+    if shard_coordinator.processes:
+        # The workers own the alerts they fired; wait for their reports before saving the index
+        await asyncio.to_thread(shard_coordinator.stop)
+    # After the final flush, so the saved index matches the database
+    save_state()
+    await close_async_client()
+
+# How many updates are processed at once (a slow handler must not block other users' updates)
+MAX_CONCURRENT_UPDATES = int(config.get("MAX_CONCURRENT_UPDATES") or 256)
+
+builder = (
+    ApplicationBuilder()
+    .token(config["TELEGRAM_BOT_TOKEN"])
+    .concurrent_updates(MAX_CONCURRENT_UPDATES)
+    .post_init(on_startup)
+    .post_shutdown(on_shutdown)
+)
+# Point the bot at another Bot API server (e.g. the fake one in bench/)
+if config.get("TELEGRAM_API_BASE_URL"):
+    builder = builder.base_url(config["TELEGRAM_API_BASE_URL"])
+bot = builder.build()
 
 register_handlers(bot)
@@ -1,24 +1,18 @@
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, Bot
 from telegram.ext import CommandHandler, ContextTypes, CallbackQueryHandler, MessageHandler, filters
-from core.gas_tracker import get_gas_price
-import sqlite3
-
-# Use a dict for chain mapping
-CHAIN_IDS = {
-    'eth': 1,
-    'bsc': 56,
-    'matic': 137
-}
-CHAIN_NAMES = {
-    'eth': 'Ethereum',
-    'bsc': 'BSC',
-    'matic': 'Polygon',
-}
-CHAIN_EMOJIS = {
-    'eth': '⚡',
-    'bsc': '🟡',
-    'matic': '🟣',
-}
+from config.chains import chains
+from core.gas_cache import gas_cache, get_gas_snapshot_async, get_gas_snapshots_async, GasSnapshot, GasPriceUnavailable
+from core.alert_index import alert_index, Alert
+from data.repository import alerts_repo
+from data.history import gas_history, parse_window
+from core.metrics import instrument_handler
+from bot.render_cache import render_cache
+from bot.alert_cache import user_alert_cache
+import asyncio
+
+# Callback data for the per-chain buttons: "<key>_track_gas" and "setalert_<key>"
+TRACK_GAS_SUFFIX = "_track_gas"
+SETALERT_PREFIX = "setalert_"
 
 def get_gas_emoji(gas_price):
     """Get emoji based on gas price (in Gwei)"""
@@ -33,104 +27,164 @@ def get_gas_emoji(gas_price):
     except:
         return "⚪"  # Unknown
 
-def main_menu_keyboard():
-    return InlineKeyboardMarkup([
-        [
-            InlineKeyboardButton("🔍 View Current Gas Fees", callback_data="track_gas"),
-            InlineKeyboardButton("📢 Set Gas Fee Alerts", callback_data="set_alert")
-        ],
-        [
-            InlineKeyboardButton("📊 Gas Status", callback_data="gas_status"),
-            InlineKeyboardButton("📢 My Alerts", callback_data="my_alerts")
-        ],
-        [
-            InlineKeyboardButton("❓ Help", callback_data="help")
-        ]
-    ])
-
-def gas_chain_keyboard():
-    return InlineKeyboardMarkup([
-        [InlineKeyboardButton(f"{CHAIN_EMOJIS['eth']} Ethereum", callback_data="eth_track_gas")],
-        [
-            InlineKeyboardButton(f"{CHAIN_EMOJIS['bsc']} BSC", callback_data="bsc_track_gas"),
-            InlineKeyboardButton(f"{CHAIN_EMOJIS['matic']} Polygon", callback_data="matic_track_gas")
-        ],
-        [InlineKeyboardButton("🔙 Back to Menu", callback_data="back_to_menu")]
-    ])
-
-def back_refresh_keyboard():
-    return InlineKeyboardMarkup(
-        [[
-            InlineKeyboardButton("🔁 Refresh", callback_data="refresh"),
-            InlineKeyboardButton("🔙 Back to Menu", callback_data="back_to_tracker")
-        ]]
-    )
+# Static keyboards are immutable, so they are built once and shared by every update
+MAIN_MENU_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("🔍 View Current Gas Fees", callback_data="track_gas"),
+        InlineKeyboardButton("📢 Set Gas Fee Alerts", callback_data="set_alert")
+    ],
+    [
+        InlineKeyboardButton("📊 Gas Status", callback_data="gas_status"),
+        InlineKeyboardButton("📢 My Alerts", callback_data="my_alerts")
+    ],
+    [
+        InlineKeyboardButton("❓ Help", callback_data="help")
+    ]
+])
+
+def _chain_keyboard(callback_data) -> InlineKeyboardMarkup:
+    """One button per registered chain, two per row, then Back to Menu"""
+    buttons = [InlineKeyboardButton(f"{chain.emoji} {chain.name}", callback_data=callback_data(chain))
+               for chain in chains]
+    rows = [buttons[i:i + 2] for i in range(0, len(buttons), 2)]
+    rows.append([InlineKeyboardButton("🔙 Back to Menu", callback_data="back_to_menu")])
+    return InlineKeyboardMarkup(rows)
+
+GAS_CHAIN_KEYBOARD = _chain_keyboard(lambda chain: f"{chain.key}{TRACK_GAS_SUFFIX}")
+
+BACK_REFRESH_KEYBOARD = InlineKeyboardMarkup(
+    [[
+        InlineKeyboardButton("🔁 Refresh", callback_data="refresh"),
+        InlineKeyboardButton("🔙 Back to Menu", callback_data="back_to_tracker")
+    ]]
+)
+
+SETALERT_KEYBOARD = _chain_keyboard(lambda chain: f"{SETALERT_PREFIX}{chain.key}")
+
+BACK_TO_MENU_KEYBOARD = InlineKeyboardMarkup([[
+    InlineKeyboardButton("🔙 Back to Menu", callback_data="back_to_menu")
+]])
+
+def _chain_summary() -> str:
+    """"*Ethereum*, *BSC*, and *Polygon*" - or just a count once the list gets long"""
+    names = [f"*{chain.name}*" for chain in chains]
+    if len(names) > 4:
+        return f"*{len(names)} chains*"
+    if len(names) <= 2:
+        return " and ".join(names)
+    return ", ".join(names[:-1]) + ", and " + names[-1]
+
+WELCOME_TEXT = (
+    "👋 Welcome {first_name} to the Cross-Chain Gas Fee Tracker!!\n\n"
+    f"⚡ Get real-time gas fee updates across {_chain_summary()}.\n"
+    "📢 Set custom alerts and get notified when gas prices drop!\n\n"
+    "Choose an option below to get started:"
+)
 
-def setalert_keyboard():
-    return InlineKeyboardMarkup([
-        [InlineKeyboardButton(f"{CHAIN_EMOJIS['eth']} Ethereum", callback_data="setalert_eth")],
-        [
-            InlineKeyboardButton(f"{CHAIN_EMOJIS['bsc']} BSC", callback_data="setalert_bsc"),
-            InlineKeyboardButton(f"{CHAIN_EMOJIS['matic']} Polygon", callback_data="setalert_matic")
-        ],
-        [InlineKeyboardButton("🔙 Back to Menu", callback_data="back_to_menu")]
-    ])
-
-def format_gas_fee_message(chain_key: str, gas_fee: dict) -> str:
-    chain_name = CHAIN_NAMES.get(chain_key, chain_key)
-    chain_emoji = CHAIN_EMOJIS.get(chain_key, "🔗")
+def format_gas_fee_message(chain_key: str, gas_fee: GasSnapshot) -> str:
+    chain_name = chains.name(chain_key)
+    chain_emoji = chains.emoji(chain_key)
     
     # Add emojis to gas prices
-    low_emoji = get_gas_emoji(gas_fee['low'])
-    medium_emoji = get_gas_emoji(gas_fee['medium'])
-    high_emoji = get_gas_emoji(gas_fee['high'])
+    low_emoji = get_gas_emoji(gas_fee.low)
+    medium_emoji = get_gas_emoji(gas_fee.medium)
+    high_emoji = get_gas_emoji(gas_fee.high)
     
     return (
         f"{chain_emoji} *{chain_name}* Gas Fees (in Gwei):\n\n"
-        f"{low_emoji} Low: *{gas_fee['low']}*\n"
-        f"{medium_emoji} Medium: *{gas_fee['medium']}*\n"
-        f"{high_emoji} High: *{gas_fee['high']}*"
+        f"{low_emoji} Low: *{gas_fee.low:g}*\n"
+        f"{medium_emoji} Medium: *{gas_fee.medium:g}*\n"
+        f"{high_emoji} High: *{gas_fee.high:g}*"
     )
 
+def render_gas_fee_message(chain_key: str, gas_fee: GasSnapshot) -> str:
+    """format_gas_fee_message, rendered once per snapshot"""
+    return render_cache.get(chain_key, (gas_fee,), lambda: format_gas_fee_message(chain_key, gas_fee))
+
+def format_status_message(chain_keys, results) -> str:
+    status_text = "📊 *Current Gas Fee Status*\n\n"
+    for chain_key, result in zip(chain_keys, results):
+        chain_name = chains.name(chain_key)
+        chain_emoji = chains.emoji(chain_key)
+        if isinstance(result, GasPriceUnavailable):
+            status_text += f"{chain_emoji} *{chain_name}*: ⚠️ API Error\n"
+        elif isinstance(result, Exception):
+            status_text += f"{chain_emoji} *{chain_name}*: ❌ Error\n"
+        else:
+            current_gas = result.current
+            gas_emoji = get_gas_emoji(current_gas)
+            status_text += f"{chain_emoji} *{chain_name}*: {gas_emoji} *{current_gas:.2f} Gwei*\n"
+    status_text += "\n🟢 Low | 🟡 Medium | 🔴 High"
+    return status_text
+
+# New snapshots make the rendered text for their chain obsolete
+gas_cache.listeners.append(render_cache.invalidate)
+# Every alert write (new, deleted, triggered, re-armed) passes through the index
+alert_index.listeners.append(user_alert_cache.on_index_change)
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /start command, show main menu."""
     if update.message:
         await update.message.reply_text(
-            text=(
-                f"👋 Welcome {update.effective_user.first_name} to the Cross-Chain Gas Fee Tracker!!\n\n"
-                "⚡ Get real-time gas fee updates across *Ethereum*, *BSC*, and *Polygon*.\n"
-                "📢 Set custom alerts and get notified when gas prices drop!\n\n"
-                "Choose an option below to get started:"
-            ),
-            reply_markup=main_menu_keyboard(),
+            text=WELCOME_TEXT.format(first_name=update.effective_user.first_name),
+            reply_markup=MAIN_MENU_KEYBOARD,
             parse_mode='Markdown'
         )
 
+def format_alerts_view(alerts):
+    """/myalerts text and delete keyboard for (id, chain, threshold, notified) rows"""
+    # Group alerts by chain
+    alerts_by_chain = {}
+    for alert_id, chain, threshold, notified in alerts:
+        if chain not in alerts_by_chain:
+            alerts_by_chain[chain] = []
+        alerts_by_chain[chain].append((alert_id, threshold))
+    
+    # Format the message
+    message = "📢 *Your Active Gas Price Alerts*\n\n"
+    
+    for chain, chain_alerts in alerts_by_chain.items():
+        chain_emoji = chains.emoji(chain)
+        chain_name = chains.name(chain)
+        
+        message += f"{chain_emoji} *{chain_name}*\n"
+        for alert_id, threshold in chain_alerts:
+            message += f"   • Alert when gas < {threshold} Gwei\n"
+        message += "\n"
+    
+    message += "💡 *Tip:* Alerts are automatically removed after they're triggered."
+    
+    # Create keyboard with delete options
+    keyboard = []
+    for alert_id, chain, threshold, notified in alerts:
+        chain_emoji = chains.emoji(chain)
+        keyboard.append([
+            InlineKeyboardButton(
+                f"🗑️ Delete {chain_emoji} {threshold} Gwei", 
+                callback_data=f"delete_alert_{alert_id}"
+            )
+        ])
+    
+    keyboard.append([InlineKeyboardButton("🔙 Back to Menu", callback_data="back_to_menu")])
+    return message, InlineKeyboardMarkup(keyboard)
+
 async def myalerts_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /myalerts command - show user's active alerts"""
     user_id = update.effective_user.id
     
     try:
-        conn = sqlite3.connect("data/alerts.db")
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, chain, threshold, notified 
-            FROM alerts 
-            WHERE user_id = ? AND notified = 0
-            ORDER BY chain, threshold
-        """, (user_id,))
-        alerts = cursor.fetchall()
-        conn.close()
+        entry = user_alert_cache.get(user_id)
+        if entry is None:
+            token = user_alert_cache.write_token()
+            entry = user_alert_cache.fill(user_id, await alerts_repo.get_user_alerts_async(user_id), token)
         
-        if not alerts:
+        if not entry.rows:
             if update.callback_query:
                 await update.callback_query.edit_message_text(
                     "📭 *No Active Alerts*\n\n"
                     "You don't have any active gas price alerts.\n"
                     "Use the menu to set up your first alert!",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Back to Menu", callback_data="back_to_menu")
-                    ]]),
+                    reply_markup=BACK_TO_MENU_KEYBOARD,
                     parse_mode='Markdown'
                 )
             else:
@@ -142,50 +196,18 @@ async def myalerts_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 )
             return
         
-        # Group alerts by chain
-        alerts_by_chain = {}
-        for alert_id, chain, threshold, notified in alerts:
-            if chain not in alerts_by_chain:
-                alerts_by_chain[chain] = []
-            alerts_by_chain[chain].append((alert_id, threshold))
-        
-        # Format the message
-        message = "📢 *Your Active Gas Price Alerts*\n\n"
-        
-        for chain, chain_alerts in alerts_by_chain.items():
-            chain_emoji = CHAIN_EMOJIS.get(chain, "🔗")
-            chain_name = CHAIN_NAMES.get(chain, chain)
-            
-            message += f"{chain_emoji} *{chain_name}*\n"
-            for alert_id, threshold in chain_alerts:
-                message += f"   • Alert when gas < {threshold} Gwei\n"
-            message += "\n"
-        
-        message += "💡 *Tip:* Alerts are automatically removed after they're triggered."
-        
-        # Create keyboard with delete options
-        keyboard = []
-        for alert_id, chain, threshold, notified in alerts:
-            chain_emoji = CHAIN_EMOJIS.get(chain, "🔗")
-            keyboard.append([
-                InlineKeyboardButton(
-                    f"🗑️ Delete {chain_emoji} {threshold} Gwei", 
-                    callback_data=f"delete_alert_{alert_id}"
-                )
-            ])
-        
-        keyboard.append([InlineKeyboardButton("🔙 Back to Menu", callback_data="back_to_menu")])
+        message, keyboard = user_alert_cache.view(entry, format_alerts_view)
         
         if update.callback_query:
             await update.callback_query.edit_message_text(
                 text=message,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=keyboard,
                 parse_mode='Markdown'
             )
         else:
             await update.message.reply_text(
                 text=message,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=keyboard,
                 parse_mode='Markdown'
             )
         
@@ -194,9 +216,7 @@ async def myalerts_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if update.callback_query:
             await update.callback_query.edit_message_text(
                 text=error_msg,
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Back to Menu", callback_data="back_to_menu")
-                ]]),
+                reply_markup=BACK_TO_MENU_KEYBOARD,
                 parse_mode='Markdown'
             )
         else:
@@ -214,47 +234,36 @@ async def delete_alert(update: Update, context: ContextTypes.DEFAULT_TYPE):
         alert_id = int(query.data.split('_')[2])
         user_id = query.from_user.id
         
-        conn = sqlite3.connect("data/alerts.db")
-        cursor = conn.cursor()
-        
         # Verify the alert belongs to the user and delete it
-        cursor.execute("""
-            DELETE FROM alerts 
-            WHERE id = ? AND user_id = ? AND notified = 0
-        """, (alert_id, user_id))
-        
-        deleted_count = cursor.rowcount
-        conn.commit()
-        conn.close()
+        deleted = await alerts_repo.delete_alert_async(alert_id, user_id)
         
-        if deleted_count > 0:
+        if deleted:
+            alert_index.remove(alert_id)
             await query.edit_message_text(
                 "✅ *Alert Deleted Successfully!*\n\n"
                 "The gas price alert has been removed.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Back to Menu", callback_data="back_to_menu")
-                ]]),
+                reply_markup=BACK_TO_MENU_KEYBOARD,
                 parse_mode='Markdown'
             )
         else:
             await query.edit_message_text(
                 "❌ *Alert Not Found*\n\n"
                 "The alert may have already been deleted or triggered.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Back to Menu", callback_data="back_to_menu")
-                ]]),
+                reply_markup=BACK_TO_MENU_KEYBOARD,
                 parse_mode='Markdown'
             )
             
     except Exception as e:
         await query.edit_message_text(
             f"❌ *Error Deleting Alert*\n\n{str(e)}",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Back to Menu", callback_data="back_to_menu")
-            ]]),
+            reply_markup=BACK_TO_MENU_KEYBOARD,
             parse_mode='Markdown'
         )
 
+SUPPORTED_CHAINS_TEXT = "\n".join(
+    f"{chain.emoji} {chain.name}" + (f" ({chain.symbol})" if chain.symbol else "") for chain in chains
+)
+
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /help command"""
     help_text = (
@@ -263,7 +272,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "• `/start` - Show main menu\n"
         "• `/help` - Show this help message\n"
         "• `/status` - Show current gas prices for all chains\n"
-        "• `/myalerts` - View your active alerts\n\n"
+        "• `/myalerts` - View your active alerts\n"
+        "• `/history <chain> [window]` - Gas price history (e.g. `/history eth 7d`)\n\n"
         "*Features:*\n"
         "• 🔍 View real-time gas fees\n"
         "• 📢 Set custom price alerts\n"
@@ -274,9 +284,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "🟡 Medium (10-50 Gwei)\n"
         "🔴 High (> 50 Gwei)\n\n"
         "*Supported Chains:*\n"
-        "⚡ Ethereum (ETH)\n"
-        "🟡 BSC (BNB)\n"
-        "🟣 Polygon (MATIC)\n\n"
+        f"{SUPPORTED_CHAINS_TEXT}\n\n"
         "*Quick Tips:*\n"
         "• Set alerts for off-peak hours when gas is typically lower\n"
         "• Use the Status command to compare gas across all chains\n"
@@ -288,9 +296,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if update.callback_query:
         await update.callback_query.edit_message_text(
             text=help_text,
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Back to Menu", callback_data="back_to_menu")
-            ]]),
+            reply_markup=BACK_TO_MENU_KEYBOARD,
             parse_mode='Markdown'
         )
     else:
@@ -301,31 +307,17 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /status command - show current gas prices for all chains"""
-    status_text = "📊 *Current Gas Fee Status*\n\n"
-    
-    for chain_key, chain_name in CHAIN_NAMES.items():
-        try:
-            chain_id = CHAIN_IDS[chain_key]
-            gas_data = get_gas_price(chain_id)
-            chain_emoji = CHAIN_EMOJIS[chain_key]
-            
-            if 'error' not in gas_data:
-                current_gas = min(float(v) for v in gas_data.values())
-                gas_emoji = get_gas_emoji(current_gas)
-                status_text += f"{chain_emoji} *{chain_name}*: {gas_emoji} *{current_gas:.2f} Gwei*\n"
-            else:
-                status_text += f"{chain_emoji} *{chain_name}*: ⚠️ API Error\n"
-        except Exception as e:
-            status_text += f"{CHAIN_EMOJIS[chain_key]} *{chain_name}*: ❌ Error\n"
-    
-    status_text += "\n🟢 Low | 🟡 Medium | 🔴 High"
+    # Fetch all chains concurrently (bounded) so one slow chain doesn't hold up the others
+    chain_keys = chains.keys()
+    snapshots = await get_gas_snapshots_async(chain.id for chain in chains)
+    results = tuple(snapshots.values())
+    # Errors are fresh objects every time, so only all-snapshot results are ever reused
+    status_text = render_cache.get("status", results, lambda: format_status_message(chain_keys, results))
     
     if update.callback_query:
         await update.callback_query.edit_message_text(
             text=status_text,
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Back to Menu", callback_data="back_to_menu")
-            ]]),
+            reply_markup=BACK_TO_MENU_KEYBOARD,
             parse_mode='Markdown'
         )
     else:
@@ -334,18 +326,60 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             parse_mode='Markdown'
         )
 
+async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /history <chain> [window] - gas price summary over a time window"""
+    args = context.args or []
+    if not args or args[0].lower() not in chains:
+        await update.message.reply_text(
+            "Usage: `/history <chain> [window]`\n"
+            f"Chains: {', '.join(chains.keys())}\n"
+            "Window examples: `1h`, `24h`, `7d`, `30d` (default 24h)",
+            parse_mode='Markdown'
+        )
+        return
+    
+    chain_key = args[0].lower()
+    try:
+        window = parse_window(args[1]) if len(args) > 1 else 24 * 3600
+        if window <= 0:
+            raise ValueError(window)
+    except ValueError:
+        await update.message.reply_text("❌ Invalid window. Use values like 1h, 24h, 7d.")
+        return
+    
+    window_label = args[1] if len(args) > 1 else "24h"
+    chain_name = chains.name(chain_key)
+    chain_emoji = chains.emoji(chain_key)
+    summary = await asyncio.to_thread(gas_history.summary, chains.get(chain_key).id, window)
+    
+    if not summary:
+        await update.message.reply_text(
+            f"📭 No gas history for {chain_emoji} *{chain_name}* in the last {window_label} yet.",
+            parse_mode='Markdown'
+        )
+        return
+    
+    await update.message.reply_text(
+        f"📈 {chain_emoji} *{chain_name}* gas over the last {window_label} (Gwei):\n\n"
+        f"{get_gas_emoji(summary['min'])} Min: *{summary['min']:.3f}*\n"
+        f"{get_gas_emoji(summary['avg'])} Avg: *{summary['avg']:.3f}*\n"
+        f"{get_gas_emoji(summary['max'])} Max: *{summary['max']:.3f}*\n\n"
+        f"Median: *{summary['p50']:.3f}* | p90: *{summary['p90']:.3f}* | p99: *{summary['p99']:.3f}*\n"
+        f"_{summary['samples']} samples_",
+        parse_mode='Markdown'
+    )
+
 async def show_gas_fee(query, chain_key: str):
     """Fetch and display gas fee for given chain"""
     try:
-        chain_id = CHAIN_IDS[chain_key]
-        gas_data = get_gas_price(chain_id)
-        text = format_gas_fee_message(chain_key, gas_data)
+        gas_data = await get_gas_snapshot_async(chains.get(chain_key).id)
+        text = render_gas_fee_message(chain_key, gas_data)
     except Exception as e:
         text = f"❌ Error fetching gas fee: {e}"
-    await query.edit_message_text(text, reply_markup=back_refresh_keyboard(), parse_mode='Markdown')
+    await query.edit_message_text(text, reply_markup=BACK_REFRESH_KEYBOARD, parse_mode='Markdown')
 
 async def setalert(query):
-    await query.edit_message_text("🪙 Choose a chain:", reply_markup=setalert_keyboard())
+    await query.edit_message_text("🪙 Choose a chain:", reply_markup=SETALERT_KEYBOARD)
 
 async def send_gas_alert(bot, chat_id: int, chain: str, current_gas_price: float, threshold: float):
     """Send a gas alert to a specific user"""
@@ -380,17 +414,11 @@ async def handle_gwei_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except ValueError:
         return await update.message.reply_text("❌ Please send a valid number (Gwei). You can use decimals like 0.8.")
     
-    conn = sqlite3.connect("data/alerts.db")
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO alerts (user_id, chat_id, chain, threshold, notified)
-        VALUES (?, ?, ?, ?, 0)
-    """, (user_id, chat_id, chain, threshold))
-    conn.commit()
-    conn.close()
-
-    chain_emoji = CHAIN_EMOJIS.get(chain, "🔗")
-    chain_name = CHAIN_NAMES.get(chain, chain)
+    alert_id = await alerts_repo.add_alert_async(user_id, chat_id, chain, threshold)
+    alert_index.add(Alert(alert_id, user_id, chat_id, chain, threshold))
+
+    chain_emoji = chains.emoji(chain)
+    chain_name = chains.name(chain)
     
     # Format threshold display based on value
     if threshold < 1:
@@ -414,35 +442,25 @@ async def handle_gwei_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
 ADMIN_IDS = [1152109549]
 async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Admin-only command to show bot statistics"""
+    """Admin-only command to show bot statistics. `/stats reconcile` recomputes the counters first"""
     if update.effective_user.id not in ADMIN_IDS:
         await update.message.reply_text("🚫 This command is for admins only.")
         return
     
     try:
-        conn = sqlite3.connect("data/alerts.db")
-        cursor = conn.cursor()
-        
-        # Get user count
-        cursor.execute("SELECT COUNT(DISTINCT user_id) FROM alerts")
-        user_count = cursor.fetchone()[0]
-        
-        # Get alert counts
-        cursor.execute("SELECT COUNT(*) FROM alerts")
-        total_alerts = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM alerts WHERE notified = 1")
-        triggered_alerts = cursor.fetchone()[0]
-        
-        # Get chain distribution
-        cursor.execute("""
-            SELECT chain, COUNT(*) as count 
-            FROM alerts 
-            GROUP BY chain
-        """)
-        chain_stats = cursor.fetchall()
+        if context.args and context.args[0].lower() == "reconcile":
+            corrected = await alerts_repo.reconcile_stats_async()
+            if corrected:
+                lines = "\n".join(f"• {name}: {old} → {new}" for name, (old, new) in corrected.items())
+                await update.message.reply_text(f"🔧 Counters recomputed, corrected:\n{lines}")
+            else:
+                await update.message.reply_text("✅ Counters recomputed, all were correct.")
         
-        conn.close()
+        stats = await alerts_repo.get_stats_async()
+        user_count = stats["users"]
+        total_alerts = stats["total"]
+        triggered_alerts = stats["triggered"]
+        chain_stats = stats["by_chain"]
         
         # Format message
         message = (
@@ -454,10 +472,16 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         
         for chain, count in chain_stats:
-            chain_emoji = CHAIN_EMOJIS.get(chain, "🔗")
-            chain_name = CHAIN_NAMES.get(chain, chain)
+            chain_emoji = chains.emoji(chain)
+            chain_name = chains.name(chain)
             message += f"{chain_emoji} {chain_name}: *{count} alerts*\n"
         
+        cache = user_alert_cache.stats()
+        message += (
+            f"\n🗂️ Alert cache: *{cache['users']}/{cache['max_users']} users*, "
+            f"*{cache['hit_rate']:.0%}* hit rate\n"
+        )
+        
         await update.message.reply_text(
             text=message,
             parse_mode='Markdown'
@@ -477,21 +501,20 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if query.data == "track_gas":
         await query.edit_message_text(
             text="🔍 Select a chain to track:",
-            reply_markup=gas_chain_keyboard(),
+            reply_markup=GAS_CHAIN_KEYBOARD,
             parse_mode='Markdown'
         )
-    elif query.data in ["eth_track_gas", "bsc_track_gas", "matic_track_gas"]:
-        # Extract chain key
-        key = query.data.split('_')[0]
+    elif query.data.endswith(TRACK_GAS_SUFFIX) and query.data.removesuffix(TRACK_GAS_SUFFIX) in chains:
+        key = query.data.removesuffix(TRACK_GAS_SUFFIX)
         context.user_data["last_chain"] = key
         await show_gas_fee(query, key)
     elif query.data == "set_alert":
         await setalert(query)
-    elif query.data.startswith("setalert_"):
-        key = query.data.split("_")[1]
+    elif query.data.startswith(SETALERT_PREFIX) and query.data.removeprefix(SETALERT_PREFIX) in chains:
+        key = query.data.removeprefix(SETALERT_PREFIX)
         context.user_data["alert_chain"] = key
-        chain_emoji = CHAIN_EMOJIS.get(key, "🔗")
-        chain_name = CHAIN_NAMES.get(key, key)
+        chain_emoji = chains.emoji(key)
+        chain_name = chains.name(key)
         await query.edit_message_text(
             f"✍️ Send the Gwei threshold for {chain_emoji} *{chain_name}*:\n\n"
             f"*Examples:*\n"
@@ -512,7 +535,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     elif query.data == "back_to_tracker":
         await query.edit_message_text(
             text="🔍 Select a chain to track:",
-            reply_markup=gas_chain_keyboard(),
+            reply_markup=GAS_CHAIN_KEYBOARD,
             parse_mode='Markdown'
         )
     elif query.data == "refresh":
@@ -522,29 +545,40 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         else:
             await query.edit_message_text(
                 "Could not refresh: missing chain info.\nPlease select a chain again.",
-                reply_markup=gas_chain_keyboard(),
+                reply_markup=GAS_CHAIN_KEYBOARD,
                 parse_mode='Markdown'
             )
     elif query.data == 'back_to_menu':
         await query.edit_message_text(
-            text=(
-                f"👋 Welcome {update.effective_user.first_name} to the Cross-Chain Gas Fee Tracker!!\n\n"
-                "⚡ Get real-time gas fee updates across *Ethereum*, *BSC*, and *Polygon*.\n"
-                "📢 Set custom alerts and get notified when gas prices drop!\n\n"
-                "Choose an option below to get started:"
-            ),
-            reply_markup=main_menu_keyboard(),
+            text=WELCOME_TEXT.format(first_name=update.effective_user.first_name),
+            reply_markup=MAIN_MENU_KEYBOARD,
             parse_mode='Markdown'
         )
     else:
         await query.edit_message_text("❓ Unknown action.")
 
+def callback_type(update: Update) -> str:
+    """Metrics label for a button press, with per-alert and per-chain ids folded away"""
+    data = update.callback_query.data or ""
+    if data.startswith("delete_alert_"):
+        return "callback:delete_alert"
+    if data.startswith(SETALERT_PREFIX):
+        return "callback:setalert"
+    if data.endswith(TRACK_GAS_SUFFIX):
+        return "callback:chain_track_gas"
+    if data in ("track_gas", "set_alert", "gas_status", "my_alerts", "help",
+                "back_to_tracker", "refresh", "back_to_menu"):
+        return f"callback:{data}"
+    return "callback:unknown"
+
 def register_handlers(app):
     """Register bot command and callback handlers."""
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("help", help_command))
-    app.add_handler(CommandHandler("status", status_command))
-    app.add_handler(CommandHandler("myalerts", myalerts_command))
-    app.add_handler(CommandHandler("stats", stats_command))
-    app.add_handler(CallbackQueryHandler(button_handler))
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_gwei_input))
+    app.add_handler(CommandHandler("start", instrument_handler("start", start)))
+    app.add_handler(CommandHandler("help", instrument_handler("help", help_command)))
+    app.add_handler(CommandHandler("status", instrument_handler("status", status_command)))
+    app.add_handler(CommandHandler("myalerts", instrument_handler("myalerts", myalerts_command)))
+    app.add_handler(CommandHandler("stats", instrument_handler("stats", stats_command)))
+    app.add_handler(CommandHandler("history", instrument_handler("history", history_command)))
+    app.add_handler(CallbackQueryHandler(instrument_handler("callback", button_handler, label=callback_type)))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND,
+                                   instrument_handler("gwei_input", handle_gwei_input)))
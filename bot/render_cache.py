@@ -0,0 +1,46 @@
+import threading
+
+
+class RenderCache:
+    """
+    Rendered message text keyed by the gas snapshots it was rendered from.
+    Snapshots are immutable and replaced on every fetch, so as long as the
+    cached entry was built from the same snapshots every user shares one
+    string. invalidate() is registered as a gas cache listener and drops
+    entries for a chain as soon as a new snapshot for it arrives.
+    """
+
+    def __init__(self):
+        self._entries = {}  # key -> (snapshots, text)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, snapshots: tuple, render) -> str:
+        """Return the text cached for key if it was rendered from snapshots, else render() it"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == snapshots:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        text = render()
+        with self._lock:
+            self._entries[key] = (snapshots, text)
+        return text
+
+    def invalidate(self, snapshot):
+        """Drop every entry rendered from an older snapshot of this chain"""
+        with self._lock:
+            for key in [k for k, (snapshots, _) in self._entries.items()
+                        if any(getattr(s, "chainid", None) == snapshot.chainid for s in snapshots)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+render_cache = RenderCache()
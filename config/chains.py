@@ -0,0 +1,76 @@
+import json
+import os
+from dataclasses import dataclass
+from config.api_keys import config
+
+# JSON list of chains; see config/chains.json for the format
+CHAINS_FILE = config.get("CHAINS_FILE") or os.path.join(os.path.dirname(__file__), "chains.json")
+
+
+@dataclass(frozen=True)
+class Chain:
+    """
+    One supported chain. `key` is the short name used in commands, callback
+    data and the alerts table; `id` the EVM chain id. `providers` limits which
+    gas providers may serve it (empty means GAS_PROVIDERS), and the poll
+    interval bounds override MIN_POLL_INTERVAL / MAX_POLL_INTERVAL.
+    """
+    key: str
+    id: int
+    name: str
+    emoji: str = "🔗"
+    symbol: str = ""
+    providers: tuple = ()
+    min_poll_interval: float = None
+    max_poll_interval: float = None
+
+
+class ChainRegistry:
+    """The chains the bot tracks, looked up by key or chain id, in configured order"""
+
+    def __init__(self, chains):
+        self._by_key = {}
+        self._by_id = {}
+        for chain in chains:
+            if chain.key in self._by_key or chain.id in self._by_id:
+                raise ValueError(f"Duplicate chain {chain.key} ({chain.id}) in chain registry")
+            self._by_key[chain.key] = chain
+            self._by_id[chain.id] = chain
+
+    @classmethod
+    def from_file(cls, path: str = CHAINS_FILE):
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)
+        return cls(
+            Chain(**{**entry, "providers": tuple(entry.get("providers") or ())})
+            for entry in entries
+        )
+
+    def get(self, key: str):
+        return self._by_key.get(key)
+
+    def by_id(self, chainid: int):
+        return self._by_id.get(chainid)
+
+    def keys(self):
+        return list(self._by_key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._by_key
+
+    def __iter__(self):
+        return iter(self._by_key.values())
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def name(self, key: str) -> str:
+        chain = self._by_key.get(key)
+        return chain.name if chain else key
+
+    def emoji(self, key: str) -> str:
+        chain = self._by_key.get(key)
+        return chain.emoji if chain else "🔗"
+
+
+chains = ChainRegistry.from_file()
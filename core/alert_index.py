@@ -0,0 +1,125 @@
+import logging
+import threading
+from bisect import bisect_left, insort
+from typing import NamedTuple
+from data.repository import alerts_repo
+
+logger = logging.getLogger(__name__)
+
+
+class Alert(NamedTuple):
+    id: int
+    user_id: int
+    chat_id: int
+    chain: str
+    threshold: float
+
+
+class AlertIndex:
+    """
+    In-memory index of armed (un-notified) alerts.
+    For each chain, alerts are kept sorted by threshold so that finding every
+    alert with threshold >= current price is a binary search plus a slice.
+    Kept in sync incrementally by the handlers and the alert cycle.
+    Listeners are called with ("add", alert) or ("remove", alert) after each change.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys = {}     # chain -> sorted list of (threshold, alert_id)
+        self._alerts = {}   # alert_id -> Alert
+        self.loaded = False
+        self.listeners = []
+
+    def load(self, repo=alerts_repo):
+        """Rebuild the index from SQLite"""
+        self.rebuild(Alert(*row) for row in repo.get_armed_alerts())
+
+    def rebuild(self, alerts):
+        keys = {}
+        by_id = {}
+        for alert in alerts:
+            by_id[alert.id] = alert
+            keys.setdefault(alert.chain, []).append((alert.threshold, alert.id))
+        for chain_keys in keys.values():
+            chain_keys.sort()
+        with self._lock:
+            self._keys = keys
+            self._alerts = by_id
+            self.loaded = True
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def _notify(self, event: str, alert: Alert):
+        for listener in self.listeners:
+            try:
+                listener(event, alert)
+            except Exception:
+                logger.exception("Error in alert index listener")
+
+    def add(self, alert: Alert):
+        with self._lock:
+            if alert.id in self._alerts:
+                return
+            self._alerts[alert.id] = alert
+            insort(self._keys.setdefault(alert.chain, []), (alert.threshold, alert.id))
+        self._notify("add", alert)
+
+    def remove(self, alert_id: int):
+        """Remove an alert (deleted or triggered). Returns the removed Alert or None"""
+        with self._lock:
+            alert = self._alerts.pop(alert_id, None)
+            if alert is None:
+                return None
+            chain_keys = self._keys[alert.chain]
+            key = (alert.threshold, alert.id)
+            i = bisect_left(chain_keys, key)
+            if i < len(chain_keys) and chain_keys[i] == key:
+                del chain_keys[i]
+            if not chain_keys:
+                del self._keys[alert.chain]
+        self._notify("remove", alert)
+        return alert
+
+    def match(self, chain: str, price: float):
+        """Return every armed alert on the chain whose threshold is >= price"""
+        with self._lock:
+            chain_keys = self._keys.get(chain)
+            if not chain_keys:
+                return []
+            start = bisect_left(chain_keys, (price,))
+            return [self._alerts[alert_id] for _, alert_id in chain_keys[start:]]
+
+    def nearest_threshold(self, chain: str, price: float):
+        """Highest armed threshold on the chain that is still below price, or None"""
+        with self._lock:
+            chain_keys = self._keys.get(chain)
+            if not chain_keys:
+                return None
+            i = bisect_left(chain_keys, (price,))
+            return chain_keys[i - 1][0] if i > 0 else None
+
+    def count(self, chain: str) -> int:
+        """Number of armed alerts on a chain"""
+        with self._lock:
+            return len(self._keys.get(chain, ()))
+
+    def active_chains(self):
+        with self._lock:
+            return list(self._keys)
+
+    def alerts(self):
+        """Snapshot of every armed alert"""
+        with self._lock:
+            return list(self._alerts.values())
+
+    def get(self, alert_id: int):
+        return self._alerts.get(alert_id)
+
+    def __len__(self):
+        return len(self._alerts)
+
+
+alert_index = AlertIndex()
@@ -1,105 +1,248 @@
-from pathlib import Path
-import sqlite3
-from data.db import DB_PATH  
-from core.gas_tracker import get_gas_price
-from telegram import Bot
-import asyncio
-
-CHAIN_IDS = {
-    'eth': 1,
-    'bsc': 56,
-    'matic': 137
-}
+import logging
+import time
+from collections import defaultdict
+from config.api_keys import config
+from config.chains import chains as chain_registry
+from core import metrics
+from core.delivery_state import delivery_state
+from core.gas_cache import gas_cache, get_gas_snapshots
+from core.alert_index import alert_index
+from core.notifier import notification_dispatcher, NotificationDispatcher
+
+logger = logging.getLogger(__name__)
+
+# Longest alert message sent to one chat; longer digests are split (Telegram's limit is 4096).
+# Never below DIGEST_MIN_LENGTH, so a part always has room for its header, footer and a few alerts
+DIGEST_MIN_LENGTH = 512
+DIGEST_MAX_LENGTH = max(DIGEST_MIN_LENGTH, min(int(config.get("DIGEST_MAX_LENGTH") or 4096), 4096))
+DIGEST_FOOTER = "\nYou can adjust your alerts in the menu below."
 
 def get_active_chains():
     """Get list of chains that have active alerts to avoid unnecessary API calls"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT DISTINCT chain 
-            FROM alerts 
-            WHERE notified = 0
-        """)
-        active_chains = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return active_chains
-    except Exception as e:
-        print(f"Error getting active chains: {e}")
+        alert_index.ensure_loaded()
+        return alert_index.active_chains()
+    except Exception:
+        logger.exception("Error getting active chains")
+        return []
+
+def fetch_chain_prices(chains):
+    """
+    Fetch one gas snapshot per chain through the shared gas cache, in parallel
+    up to FETCH_CONCURRENCY chains at a time. Stale snapshots are never used:
+    a chain whose fetch failed is reported in failures.
+    Returns (prices, failures, requests_made) where prices maps chain -> current
+    gas price in Gwei (lowest of low/medium/high) and failures maps chain -> error.
+    """
+    prices = {}
+    failures = {}
+    known = {}
+    for chain in chains:
+        entry = chain_registry.get(chain)
+        if entry is None:
+            failures[chain] = "Unknown chain"
+        else:
+            known[entry.id] = chain
+
+    if not known:
+        return prices, failures, 0
+
+    requests_before = gas_cache.requests
+    # A failed fetch must show up as a failure, not as an old price to alert on
+    results = get_gas_snapshots(known, allow_stale=False)
+    requests_made = gas_cache.requests - requests_before
+
+    for chainid, result in results.items():
+        if isinstance(result, Exception):
+            failures[known[chainid]] = str(result)
+        else:
+            prices[known[chainid]] = result.current
+
+    return prices, failures, requests_made
+
+def _delivery_failed(alert):
+    """Re-arm an alert whose message could not be delivered"""
+    delivery_state.failed(alert.id)
+    alert_index.add(alert)
+
+def format_alert_message(chain: str, current_gas_price: float, threshold: float) -> str:
+    return (
+        f"🚨 *Gas Alert!*\n"
+        f"Chain: *{chain.upper()}*\n"
+        f"Current gas price: *{current_gas_price:.3f} Gwei*\n"
+        f"Threshold: *{threshold} Gwei*\n\n"
+        f"✅ Gas price is now below your {threshold} Gwei threshold!\n"
+        "You can adjust your alerts in the menu below."
+    )
+
+def _digest_header(count: int, part: int = 1, parts: int = 1) -> str:
+    header = f"🚨 *Gas Alerts!* ({count} triggered)"
+    if parts > 1:
+        header += f" ({part}/{parts})"
+    return header + "\n"
+
+def format_alert_digests(fired, max_length: int = DIGEST_MAX_LENGTH):
+    """
+    Render the alerts one chat fired this cycle as [(text, alerts)], one entry per
+    message. fired is a list of (chain, price, alert); a single alert keeps the
+    plain alert message. Alerts are grouped under one line per chain and packed
+    into as few messages as fit max_length (at least DIGEST_MIN_LENGTH),
+    repeating the chain line when a chain spills over into the next message.
+    """
+    max_length = max(max_length, DIGEST_MIN_LENGTH)
+    if len(fired) == 1:
+        chain, price, alert = fired[0]
+        return [(format_alert_message(chain, price, alert.threshold), [alert])]
+
+    by_chain = defaultdict(list)
+    for chain, price, alert in fired:
+        by_chain[(chain, price)].append(alert)
+
+    # Room left for chain and threshold lines once the widest header and the footer are in
+    budget = max_length - len(_digest_header(len(fired), len(fired), len(fired))) - len(DIGEST_FOOTER)
+    parts = []   # [(lines, alerts)]
+    lines, alerts, used = [], [], 0
+    for (chain, price), chain_alerts in by_chain.items():
+        chain_line = f"\n*{chain.upper()}* at *{price:.3f} Gwei*\n"
+        current_chain = None
+        for alert in sorted(chain_alerts, key=lambda a: -a.threshold):
+            line = f"✅ below your {alert.threshold} Gwei threshold\n"
+            needed = len(line) + (len(chain_line) if current_chain != chain else 0)
+            if alerts and used + needed > budget:
+                parts.append((lines, alerts))
+                lines, alerts, used, current_chain = [], [], 0, None
+                needed = len(line) + len(chain_line)
+            if current_chain != chain:
+                lines.append(chain_line)
+                current_chain = chain
+            lines.append(line)
+            alerts.append(alert)
+            used += needed
+    parts.append((lines, alerts))
+
+    return [
+        (_digest_header(len(fired), part, len(parts)) + "".join(lines) + DIGEST_FOOTER, alerts)
+        for part, (lines, alerts) in enumerate(parts, 1)
+    ]
+
+def _claim_triggered(chain: str, current_gas_price: float):
+    """
+    Take the alerts that fire at this price out of the index and claim them in the
+    database before anything is sent, so neither the next cycle nor a restart sends
+    them twice. Only the alerts actually claimed are returned.
+    """
+    triggered = alert_index.match(chain, current_gas_price)
+    if not triggered:
         return []
+    for alert in triggered:
+        alert_index.remove(alert.id)
+    claimed = delivery_state.claim([alert.id for alert in triggered])
+    if len(claimed) < len(triggered):
+        # Delivered, in flight or deleted since the index saw them
+        logger.warning("Skipping alerts that could not be claimed",
+                       extra={"chain": chain, "skipped": len(triggered) - len(claimed)})
+    return [alert for alert in triggered if alert.id in claimed]
+
+def _digest_delivered(alerts):
+    for alert in alerts:
+        delivery_state.delivered(alert.id)
+
+def _digest_failed(alerts):
+    for alert in alerts:
+        _delivery_failed(alert)
+
+def evaluate_prices(prices: dict, dispatcher: NotificationDispatcher = None):
+    """
+    Queue notifications for every armed alert that fires at these prices
+    (chain -> Gwei). Alerts fired in the same call are grouped by chat and sent
+    as one digest message per chat, split only when it exceeds DIGEST_MAX_LENGTH.
+    Returns (alerts triggered, messages queued).
+    """
+    dispatcher = dispatcher or notification_dispatcher
+    by_chat = defaultdict(list)
+    triggered = 0
+    for chain, current_gas_price in prices.items():
+        for alert in _claim_triggered(chain, current_gas_price):
+            by_chat[alert.chat_id].append((chain, current_gas_price, alert))
+            triggered += 1
+
+    messages = 0
+    for chat_id, fired in by_chat.items():
+        for text, alerts in format_alert_digests(fired):
+            dispatcher.submit(
+                chat_id,
+                text,
+                on_sent=lambda alerts=alerts: _digest_delivered(alerts),
+                on_failed=lambda error, alerts=alerts: _digest_failed(alerts),
+            )
+            metrics.digest_alerts.observe(len(alerts))
+            messages += 1
+    return triggered, messages
+
+def evaluate_chain(chain: str, current_gas_price: float, dispatcher: NotificationDispatcher = None) -> int:
+    """
+    Queue notifications for every armed alert on the chain that fires at this price.
+    The index only hands back alerts whose threshold is at or above the price.
+    Returns the number of alerts triggered.
+    """
+    return evaluate_prices({chain: current_gas_price}, dispatcher)[0]
 
-def check_alerts_and_notify(bot: Bot):
+def check_alerts_and_notify(dispatcher: NotificationDispatcher = None, chains=None):
     """
     Check all active alerts and send notifications when gas prices drop below thresholds.
     All gas prices are in Gwei (not wei).
     Only checks chains where users have active alerts to save API calls.
+
+    Runs in two stages: first one gas price is fetched per active chain (in parallel),
+    then the in-memory alert index returns the alerts that fire at those prices.
+    Triggered alerts are claimed in one transaction, then grouped into one digest
+    message per chat and handed to the notification dispatcher running on the
+    bot's event loop. Delivery results
+    are written back in batches by the delivery state batcher.
+    When chains is given, only those chains are checked.
+    Returns a dict with the number of upstream requests made, armed alerts
+    evaluated, alerts queued and messages queued.
     """
+    dispatcher = dispatcher or notification_dispatcher
+    stats = {"requests": 0, "evaluated": 0, "queued": 0, "messages": 0, "failed_chains": {}}
+    started = time.perf_counter()
     try:
+        if not dispatcher.running:
+            logger.warning("⚠️ Notification dispatcher not running - skipping alert check")
+            return stats
+
         # Get chains with active alerts to avoid unnecessary API calls
         active_chains = get_active_chains()
+        if chains is not None:
+            active_chains = [chain for chain in active_chains if chain in chains]
         if not active_chains:
-            print("💤 No active alerts - skipping gas price check")
-            return
+            logger.info("💤 No active alerts - skipping gas price check")
+            return stats
         
-        print(f"🔍 Checking gas prices for chains with active alerts: {', '.join(active_chains)}")
+        logger.info("🔍 Checking gas prices for chains with active alerts", extra={"chains": active_chains})
         
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, user_id, chat_id, chain, threshold FROM alerts WHERE notified = 0")
-        alerts = cursor.fetchall()
-        
-        for alert_id, user_id, chat_id, chain, threshold in alerts:
-            try:
-                gas_data = get_gas_price(CHAIN_IDS[chain])
-                
-                # Check if gas_data contains an error
-                if 'error' in gas_data:
-                    print(f"API error for {chain}: {gas_data['error']}")
-                    continue
-                
-                # Calculate current gas price (lowest of the three) - all values are in Gwei
-                try:
-                    current_gas_price = min(float(v) for v in gas_data.values())
-                except (ValueError, TypeError) as e:
-                    print(f"Error parsing gas price for {chain}: {e}, data: {gas_data}")
-                    continue
-                
-                print(f"Chain: {chain}, Current: {current_gas_price:.3f} Gwei, Threshold: {threshold} Gwei")
-                
-                # Compare Gwei to Gwei (both are in the same unit)
-                if current_gas_price <= threshold:
-                    try:
-                        # Use asyncio.run to run the async bot.send_message in a new event loop
-                        asyncio.run(bot.send_message(
-                            chat_id=chat_id,
-                            text=(
-                                f"🚨 *Gas Alert!*\n"
-                                f"Chain: *{chain.upper()}*\n"
-                                f"Current gas price: *{current_gas_price:.3f} Gwei*\n"
-                                f"Threshold: *{threshold} Gwei*\n\n"
-                                f"✅ Gas price is now below your {threshold} Gwei threshold!\n"
-                                "You can adjust your alerts in the menu below."
-                            ),
-                            parse_mode='Markdown'
-                        ))
-                        print(f"Alert sent successfully to chat {chat_id}")
-                        
-                        # Mark this alert as notified
-                        cursor.execute("UPDATE alerts SET notified = 1 WHERE id = ?", (alert_id,))
-                        conn.commit()
-                        
-                    except Exception as e:
-                        print(f"Error sending message: {e}")
-                        
-            except (ValueError, KeyError) as e:
-                print(f"Error processing gas data for {chain}: {e}")
-                continue
-            except Exception as e:
-                print(f"Unexpected error for {chain}: {e}")
-                continue
+        # Stage 1: one snapshot per chain
+        prices, failures, requests_made = fetch_chain_prices(active_chains)
+        stats["requests"] = requests_made
+        stats["failed_chains"] = failures
+        for chain, error in failures.items():
+            logger.warning("API error", extra={"chain": chain, "error": error})
+        for chain, current_gas_price in prices.items():
+            logger.info("Current gas price", extra={"chain": chain, "gwei": round(current_gas_price, 3)})
+
+        # Stage 2: evaluate alerts against the snapshots. The index only hands
+        # back alerts whose threshold is at or above the current price.
+        # Armed alerts on the chains that got a price are the ones compared this cycle
+        stats["evaluated"] = sum(alert_index.count(chain) for chain in prices)
+        triggered, messages = evaluate_prices(prices, dispatcher)
+        stats["queued"] = triggered
+        stats["messages"] = messages
+
+        metrics.alerts_evaluated.observe(stats["evaluated"])
+        metrics.alerts_fired.observe(stats["queued"])
+        metrics.alert_cycle_seconds.observe(time.perf_counter() - started)
+        logger.info("📈 Cycle done", extra={key: stats[key] for key in ("requests", "evaluated", "queued", "messages")})
                 
-    except Exception as e:
-        print(f"Database error: {e}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
+    except Exception:
+        logger.exception("Error checking alerts")
+    return stats
@@ -0,0 +1,64 @@
+import logging
+import time
+from config.api_keys import config
+from data.repository import alerts_repo
+
+logger = logging.getLogger(__name__)
+
+# How often delivered alerts are moved out of the hot table (seconds)
+ARCHIVE_INTERVAL = float(config.get("ARCHIVE_INTERVAL") or 300)
+# Rows moved or purged per transaction, so writers are never blocked for long
+ARCHIVE_BATCH_SIZE = int(config.get("ARCHIVE_BATCH_SIZE") or 1000)
+# Archived alerts older than this are dropped (days, 0 keeps them forever)
+ARCHIVE_RETENTION_DAYS = float(config.get("ARCHIVE_RETENTION_DAYS") or 90)
+# Free pages handed back to the filesystem per pass
+VACUUM_PAGES = int(config.get("VACUUM_PAGES") or 2000)
+
+
+class AlertArchiver:
+    """
+    Keeps the hot alerts table down to armed and in-flight alerts.
+    run_once() is scheduled on the bot's JobQueue every ARCHIVE_INTERVAL: it
+    moves delivered alerts to alerts_archive in batches, drops archived rows
+    past the retention period, and runs an incremental vacuum so the freed
+    pages don't linger in the file.
+    """
+
+    def __init__(self, repo=alerts_repo, batch_size: int = ARCHIVE_BATCH_SIZE,
+                 retention_days: float = ARCHIVE_RETENTION_DAYS, vacuum_pages: int = VACUUM_PAGES):
+        self.repo = repo
+        self.batch_size = batch_size
+        self.retention_days = retention_days
+        self.vacuum_pages = vacuum_pages
+        self.archived = 0
+        self.purged = 0
+        self.free_pages = 0
+
+    def run_once(self) -> dict:
+        archived = purged = 0
+        while True:
+            moved = self.repo.archive_delivered(self.batch_size)
+            archived += moved
+            if moved < self.batch_size:
+                break
+        if self.retention_days > 0:
+            cutoff = time.time() - self.retention_days * 86400
+            while True:
+                dropped = self.repo.purge_archive(cutoff, self.batch_size)
+                purged += dropped
+                if dropped < self.batch_size:
+                    break
+        if archived or purged:
+            self.free_pages = self.repo.incremental_vacuum(self.vacuum_pages)
+        self.archived += archived
+        self.purged += purged
+        if archived or purged:
+            logger.info("🗄️ Archived alerts", extra={"archived": archived, "purged": purged,
+                                                     "free_pages": self.free_pages})
+        return {"archived": archived, "purged": purged}
+
+    def stats(self) -> dict:
+        return {"archived": self.archived, "purged": self.purged, "free_pages": self.free_pages}
+
+
+alert_archiver = AlertArchiver()
@@ -0,0 +1,110 @@
+import logging
+import threading
+import time
+from config.api_keys import config
+from data.repository import alerts_repo, ARMED, DELIVERED, IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+# Flush delivery confirmations once this many are buffered, or after this many seconds
+DELIVERY_FLUSH_SIZE = int(config.get("DELIVERY_FLUSH_SIZE") or 500)
+DELIVERY_FLUSH_INTERVAL = float(config.get("DELIVERY_FLUSH_INTERVAL") or 1.0)
+
+
+class DeliveryStateBatcher:
+    """
+    Buffers delivery results for triggered alerts and writes them in batches.
+
+    Triggered alerts are claimed (marked in flight) in one transaction before
+    their messages are queued, so a crash can never lead to a re-send. Delivered
+    alerts are then confirmed and failed ones re-armed by a background thread
+    with one executemany per flush, bounded by size and time.
+    """
+
+    def __init__(self, repo=alerts_repo, flush_size: int = DELIVERY_FLUSH_SIZE,
+                 flush_interval: float = DELIVERY_FLUSH_INTERVAL):
+        self.repo = repo
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._delivered = []
+        self._failed = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self.flushes = 0
+        self.last_flush = time.monotonic()
+
+    def claim(self, alert_ids) -> set:
+        """Claim alerts for sending. Returns the ids claimed; only those may be sent"""
+        return self.repo.claim_alerts(alert_ids)
+
+    def delivered(self, alert_id: int):
+        self._add(self._delivered, alert_id)
+
+    def failed(self, alert_id: int):
+        self._add(self._failed, alert_id)
+
+    def _add(self, buffer, alert_id: int):
+        with self._cond:
+            buffer.append(alert_id)
+            if len(self._delivered) + len(self._failed) >= self.flush_size:
+                self._cond.notify()
+
+    @property
+    def pending(self) -> int:
+        return len(self._delivered) + len(self._failed)
+
+    def flush(self) -> int:
+        """Write all buffered results in a single transaction"""
+        with self._cond:
+            delivered, self._delivered = self._delivered, []
+            failed, self._failed = self._failed, []
+        self.last_flush = time.monotonic()
+        if not delivered and not failed:
+            return 0
+        try:
+            with self.repo.conn as conn:
+                conn.executemany(
+                    "UPDATE alerts SET notified = ? WHERE id = ? AND notified = ?",
+                    [(DELIVERED, i, IN_FLIGHT) for i in delivered] + [(ARMED, i, IN_FLIGHT) for i in failed]
+                )
+        except Exception:
+            # Put them back so the next flush retries them
+            with self._cond:
+                self._delivered[:0] = delivered
+                self._failed[:0] = failed
+            raise
+        self.flushes += 1
+        return len(delivered) + len(failed)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="delivery-state-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flush thread and write whatever is still buffered"""
+        if self._thread is not None:
+            with self._cond:
+                self._stopping = True
+                self._cond.notify()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopping and self.pending < self.flush_size:
+                    self._cond.wait(self.flush_interval)
+                if self._stopping:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Error flushing delivery state")
+
+
+delivery_state = DeliveryStateBatcher()
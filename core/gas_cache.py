@@ -0,0 +1,302 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from config.api_keys import config
+from core import metrics
+from core.providers import provider_router
+
+logger = logging.getLogger(__name__)
+
+# How long a fetched price is served without going upstream again (seconds)
+GAS_CACHE_TTL = float(config.get("GAS_CACHE_TTL") or 15)
+# How long the last good price may still be served when the upstream call fails (seconds)
+GAS_CACHE_MAX_STALE = float(config.get("GAS_CACHE_MAX_STALE") or 300)
+# Most chains fetched at once when fanning out over many chains (/status, alert cycles)
+FETCH_CONCURRENCY = int(config.get("FETCH_CONCURRENCY") or 8)
+
+
+class GasPriceUnavailable(Exception):
+    """Raised when no fresh or acceptably stale gas price exists for a chain"""
+
+
+@dataclass(frozen=True, slots=True)
+class GasSnapshot:
+    """Gas prices for one chain in Gwei, parsed once from the Etherscan response"""
+    chainid: int
+    low: float
+    medium: float
+    high: float
+    fetched_at: float
+
+    @property
+    def current(self) -> float:
+        """Lowest of the three prices, used for alert comparisons"""
+        return min(self.low, self.medium, self.high)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    @classmethod
+    def from_gas_data(cls, chainid: int, gas_data: dict, fetched_at: float = None):
+        return cls(
+            chainid=chainid,
+            low=float(gas_data["low"]),
+            medium=float(gas_data["medium"]),
+            high=float(gas_data["high"]),
+            fetched_at=time.time() if fetched_at is None else fetched_at,
+        )
+
+
+class GasPriceCache:
+    """
+    Process-wide TTL cache in front of the gas price providers, keyed by chain id.
+    Shared by the Telegram handlers and the scheduler. When the upstream call
+    fails, handlers are served the last good snapshot for up to max_stale
+    seconds; the alert cycle asks with allow_stale=False and gets the error.
+
+    Fetches are single-flight: while one caller (async handler or scheduler
+    thread) is fetching a chain, every other caller for that chain waits for
+    and shares its result instead of sending its own request.
+    """
+
+    def __init__(self, fetcher=provider_router.fetch, async_fetcher=provider_router.afetch,
+                 ttl: float = GAS_CACHE_TTL, max_stale: float = GAS_CACHE_MAX_STALE):
+        self.fetcher = fetcher
+        self.async_fetcher = async_fetcher
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._snapshots = {}
+        self._inflight = {}  # chainid -> Future of the fetch in progress
+        self._warm = set()   # chains whose snapshot was restored at startup and not yet refreshed
+        self._background = set()
+        self._lock = threading.Lock()
+        self.listeners = []  # called with every freshly fetched snapshot
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.errors = 0
+        self.requests = 0
+        self.coalesced = 0
+
+    def peek(self, chainid: int):
+        """Return the cached snapshot for a chain (fresh or not) without fetching"""
+        return self._snapshots.get(chainid)
+
+    def put(self, snapshot: GasSnapshot):
+        with self._lock:
+            self._snapshots[snapshot.chainid] = snapshot
+            self._warm.discard(snapshot.chainid)
+
+    def push(self, snapshot: GasSnapshot):
+        """Store a snapshot that arrived outside a fetch (e.g. streamed) and tell the listeners"""
+        self.put(snapshot)
+        self._notify(snapshot)
+
+    def restore(self, snapshot: GasSnapshot):
+        """Put back a snapshot saved by a previous run. aget() serves it once while refreshing"""
+        with self._lock:
+            self._snapshots[snapshot.chainid] = snapshot
+            self._warm.add(snapshot.chainid)
+
+    def chains(self):
+        return list(self._snapshots)
+
+    def _fresh(self, chainid: int):
+        snapshot = self._snapshots.get(chainid)
+        if snapshot is not None and snapshot.age < self.ttl:
+            with self._lock:
+                self.hits += 1
+            metrics.gas_cache_lookups.inc(result="hit")
+            return snapshot, True
+        with self._lock:
+            self.misses += 1
+        metrics.gas_cache_lookups.inc(result="miss")
+        return snapshot, False
+
+    def _notify(self, snapshot: GasSnapshot):
+        for listener in self.listeners:
+            try:
+                listener(snapshot)
+            except Exception:
+                logger.exception("Error in gas snapshot listener")
+
+    def _store(self, chainid: int, gas_data: dict) -> GasSnapshot:
+        """Parse an upstream result; raises GasPriceUnavailable if it is an error"""
+        error = None
+        try:
+            if 'error' in gas_data:
+                error = gas_data['error']
+            else:
+                fresh = GasSnapshot.from_gas_data(chainid, gas_data)
+                self.put(fresh)
+                self._notify(fresh)
+                return fresh
+        except (ValueError, TypeError, KeyError) as e:
+            error = f"Error parsing gas price: {e}"
+
+        with self._lock:
+            self.errors += 1
+        raise GasPriceUnavailable(error)
+
+    def _stale_or_raise(self, previous, error: GasPriceUnavailable, allow_stale: bool) -> GasSnapshot:
+        """After a failed fetch: the last good snapshot if the caller accepts one still within max_stale"""
+        if allow_stale and previous is not None and previous.age < self.max_stale:
+            with self._lock:
+                self.stale += 1
+            metrics.gas_cache_lookups.inc(result="stale")
+            return previous
+        raise error
+
+    def _join(self, chainid: int):
+        """
+        Return (future, leader). The leader must fetch and resolve the future;
+        everyone else waits on it.
+        """
+        with self._lock:
+            future = self._inflight.get(chainid)
+            if future is not None:
+                self.coalesced += 1
+                metrics.gas_cache_lookups.inc(result="coalesced")
+                return future, False
+            future = self._inflight[chainid] = Future()
+            self.requests += 1
+            return future, True
+
+    def _resolve(self, chainid: int, future: Future, result=None, error: BaseException = None):
+        with self._lock:
+            self._inflight.pop(chainid, None)
+        if error is not None:
+            if not isinstance(error, Exception):
+                # Don't hand the leader's cancellation to the callers sharing its fetch
+                error = GasPriceUnavailable("Gas price fetch was cancelled")
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def get(self, chainid: int, allow_stale: bool = True) -> GasSnapshot:
+        """
+        Return a snapshot for the chain, fetching upstream when the cached one has
+        expired. If the fetch fails, allow_stale=False raises instead of serving the
+        last good snapshot (the alert cycle must not act on an old price).
+        """
+        snapshot, fresh = self._fresh(chainid)
+        if fresh:
+            return snapshot
+        try:
+            return self._fetch(chainid)
+        except GasPriceUnavailable as e:
+            return self._stale_or_raise(snapshot, e, allow_stale)
+
+    def _fetch(self, chainid: int) -> GasSnapshot:
+        future, leader = self._join(chainid)
+        if not leader:
+            return future.result()
+        try:
+            result = self._store(chainid, self.fetcher(chainid))
+        except BaseException as e:
+            self._resolve(chainid, future, error=e)
+            raise
+        self._resolve(chainid, future, result)
+        return result
+
+    async def aget(self, chainid: int, allow_stale: bool = True) -> GasSnapshot:
+        """Async variant of get() for use from bot handlers"""
+        snapshot, fresh = self._fresh(chainid)
+        if fresh:
+            return snapshot
+        if allow_stale and chainid in self._warm and snapshot.age < self.max_stale:
+            # Restored at startup: answer right away and refresh behind it
+            self._warm.discard(chainid)
+            task = asyncio.create_task(self._refresh(chainid))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            return snapshot
+        try:
+            return await self._afetch(chainid)
+        except GasPriceUnavailable as e:
+            return self._stale_or_raise(snapshot, e, allow_stale)
+
+    async def _refresh(self, chainid: int):
+        try:
+            await self._afetch(chainid)
+        except Exception as e:
+            logger.warning("Background gas price refresh failed", extra={"chainid": chainid, "error": str(e)})
+
+    async def _afetch(self, chainid: int) -> GasSnapshot:
+        future, leader = self._join(chainid)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            result = self._store(chainid, await self.async_fetcher(chainid))
+        except BaseException as e:
+            self._resolve(chainid, future, error=e)
+            raise
+        self._resolve(chainid, future, result)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+            self._warm.clear()
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "errors": self.errors,
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "entries": len(self._snapshots),
+        }
+
+
+gas_cache = GasPriceCache()
+
+
+def get_gas_snapshot(chainid: int) -> GasSnapshot:
+    """Cached gas price lookup used by handlers and the scheduler"""
+    return gas_cache.get(chainid)
+
+
+async def get_gas_snapshot_async(chainid: int) -> GasSnapshot:
+    """Cached gas price lookup for async handlers, never blocks the event loop"""
+    return await gas_cache.aget(chainid)
+
+
+_fanout_pool = ThreadPoolExecutor(max_workers=FETCH_CONCURRENCY, thread_name_prefix="gas-fanout")
+
+
+def get_gas_snapshots(chainids, allow_stale: bool = True) -> dict:
+    """
+    Snapshots for many chains, fetched in parallel with at most FETCH_CONCURRENCY
+    upstream calls in flight. Maps chain id -> GasSnapshot or the exception raised.
+    """
+    def fetch(chainid):
+        try:
+            return gas_cache.get(chainid, allow_stale)
+        except Exception as e:
+            return e
+
+    chainids = list(chainids)
+    return dict(zip(chainids, _fanout_pool.map(fetch, chainids)))
+
+
+async def get_gas_snapshots_async(chainids, concurrency: int = FETCH_CONCURRENCY) -> dict:
+    """Async get_gas_snapshots() for handlers; cached chains return without waiting for a slot"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(chainid):
+        snapshot = gas_cache.peek(chainid)
+        if snapshot is not None and snapshot.age < gas_cache.ttl:
+            return await gas_cache.aget(chainid)
+        async with semaphore:
+            return await gas_cache.aget(chainid)
+
+    chainids = list(chainids)
+    results = await asyncio.gather(*(fetch(chainid) for chainid in chainids), return_exceptions=True)
+    return dict(zip(chainids, results))
@@ -1,34 +1,89 @@
+import asyncio
+import time
 import requests
+import httpx
 from config.api_keys import config
+from core.key_manager import key_manager, ApiBudgetExhausted
 
-ETHERSCAN_API_KEY=config["ETHERSCAN_API_KEY"]
+ETHERSCAN_URL = config.get("ETHERSCAN_API_URL") or "https://api.etherscan.io/v2/api"
+REQUEST_TIMEOUT = 5
 
-def get_gas_price(chainid):
-    url= "https://api.etherscan.io/v2/api"
+# One long-lived pooled client shared by all async callers (created lazily on the bot's loop)
+_async_client = None
 
-    params = {
+def _gas_params(chainid, apikey):
+    return {
         "chainid":chainid,
         "module": "gastracker",
         "action": "gasoracle",
-        "apikey": ETHERSCAN_API_KEY,
+        "apikey": apikey,
     }
 
+def _parse_gas_response(data):
+    if data.get("status")=="1":
+        return {
+            "low": data["result"]["SafeGasPrice"],
+            "medium": data["result"]["ProposeGasPrice"],
+            "high": data["result"]["FastGasPrice"]
+        }
+    else:
+        # Optional: Return entire error object or some default/error value
+        return {"error": data.get("message", "Unknown error"), "response": data}
 
+def get_gas_price(chainid):
     try:
-        response= requests.get(url,params=params,timeout=5)
-        response.raise_for_status()
+        apikey, wait = key_manager.reserve()
+    except ApiBudgetExhausted as e:
+        return {"error": str(e)}
+    if wait:
+        time.sleep(wait)
 
-        data= response.json()
-
-        if data.get("status")=="1":
-            return {
-                "low": data["result"]["SafeGasPrice"],
-                "medium": data["result"]["ProposeGasPrice"],
-                "high": data["result"]["FastGasPrice"]
-            }
-        else:
-            # Optional: Return entire error object or some default/error value
-            return {"error": data.get("message", "Unknown error"), "response": data}
+    try:
+        response= requests.get(ETHERSCAN_URL,params=_gas_params(chainid, apikey),timeout=REQUEST_TIMEOUT)
+        if response.status_code == 429:
+            key_manager.report(apikey, status_code=429)
+        response.raise_for_status()
+        data = response.json()
+        key_manager.report(apikey, data)
+        return _parse_gas_response(data)
         
     except requests.exceptions.RequestException as e:
-        return {"error":str(e)}
\ No newline at end of file
+        return {"error":str(e)}
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the shared keep-alive client, creating it on first use"""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(REQUEST_TIMEOUT),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60),
+        )
+    return _async_client
+
+async def close_async_client():
+    """Close the shared client, called on bot shutdown"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+async def get_gas_price_async(chainid):
+    """Async variant of get_gas_price that never blocks the event loop"""
+    try:
+        apikey, wait = key_manager.reserve()
+    except ApiBudgetExhausted as e:
+        return {"error": str(e)}
+    if wait:
+        await asyncio.sleep(wait)
+
+    try:
+        response = await get_async_client().get(ETHERSCAN_URL, params=_gas_params(chainid, apikey))
+        if response.status_code == 429:
+            key_manager.report(apikey, status_code=429)
+        response.raise_for_status()
+        data = response.json()
+        key_manager.report(apikey, data)
+        return _parse_gas_response(data)
+
+    except (httpx.HTTPError, ValueError) as e:
+        return {"error": str(e)}
@@ -0,0 +1,162 @@
+import logging
+import threading
+import time
+from config.api_keys import config
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+# Etherscan free tier limits per key
+KEY_RATE_PER_SECOND = float(config.get("ETHERSCAN_KEY_RATE_PER_SECOND") or 5)
+KEY_RATE_PER_DAY = float(config.get("ETHERSCAN_KEY_RATE_PER_DAY") or 100000)
+# Longest we'll wait for a per-second token before giving up on a request (seconds)
+MAX_KEY_WAIT = 2.0
+# How long a key sits out after errors (seconds)
+RATE_LIMIT_COOLDOWN = 2.0
+INVALID_KEY_COOLDOWN = 3600.0
+
+
+class ApiBudgetExhausted(Exception):
+    """Raised when no API key has budget left for a request"""
+
+
+class _Bucket:
+    """Non-blocking token bucket: refills `rate` tokens per second up to `capacity`"""
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class _KeyState:
+    __slots__ = ("key", "second", "day", "cooldown_until", "strikes", "requests", "errors")
+
+    def __init__(self, key: str, per_second: float, per_day: float):
+        self.key = key
+        self.second = _Bucket(per_second, max(1.0, per_second))
+        self.day = _Bucket(per_day / 86400, per_day)
+        self.cooldown_until = 0.0
+        self.strikes = 0
+        self.requests = 0
+        self.errors = 0
+
+
+class ApiKeyManager:
+    """
+    Spreads Etherscan requests across several API keys.
+    Each key has a per-second and a per-day token bucket; reserve() picks the
+    key with the most per-second budget left. Keys that return rate-limit or
+    invalid-key errors are taken out of rotation for a cooldown period.
+    """
+
+    def __init__(self, keys, per_second: float = KEY_RATE_PER_SECOND, per_day: float = KEY_RATE_PER_DAY):
+        self._keys = [_KeyState(key, per_second, per_day) for key in dict.fromkeys(keys) if key]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def reserve(self):
+        """
+        Take one request's worth of budget. Returns (key, wait) where the caller
+        should wait `wait` seconds before sending. Raises ApiBudgetExhausted.
+        """
+        with self._lock:
+            now = time.monotonic()
+            best = None
+            for state in self._keys:
+                if state.cooldown_until > now:
+                    continue
+                state.second.refill(now)
+                state.day.refill(now)
+                if state.day.tokens < 1:
+                    continue
+                if best is None or state.second.tokens > best.second.tokens:
+                    best = state
+            if best is None:
+                raise ApiBudgetExhausted("No Etherscan API key has budget left")
+            wait = best.second.wait_time()
+            if wait > MAX_KEY_WAIT:
+                raise ApiBudgetExhausted("Etherscan request rate exhausted on all keys")
+            best.second.tokens -= 1
+            best.day.tokens -= 1
+            best.requests += 1
+            return best.key, wait
+
+    def report(self, key: str, data: dict = None, status_code: int = None):
+        """Record the outcome of a request made with `key`"""
+        message = ""
+        if data and data.get("status") != "1":
+            message = f"{data.get('message', '')} {data.get('result', '')}".lower()
+        with self._lock:
+            state = next((s for s in self._keys if s.key == key), None)
+            if state is None:
+                return
+            if status_code == 429 or "rate limit" in message:
+                state.errors += 1
+                state.strikes += 1
+                cooldown = RATE_LIMIT_COOLDOWN * 2 ** min(state.strikes - 1, 6)
+                state.cooldown_until = time.monotonic() + cooldown
+                logger.warning("⏳ Etherscan key rate limited - benched", extra={
+                    "key": f"...{key[-4:]}", "cooldown": cooldown, "per_day_left": int(state.day.tokens),
+                    "active_keys": self._active(),
+                })
+            elif "invalid api key" in message or "missing/invalid api key" in message:
+                state.errors += 1
+                state.cooldown_until = time.monotonic() + INVALID_KEY_COOLDOWN
+                logger.warning("⚠️ Etherscan key rejected - out of rotation", extra={
+                    "key": f"...{key[-4:]}", "cooldown": INVALID_KEY_COOLDOWN, "active_keys": self._active(),
+                })
+            else:
+                state.strikes = 0
+
+    def _active(self) -> int:
+        now = time.monotonic()
+        return sum(1 for s in self._keys if s.cooldown_until <= now)
+
+    def remaining(self) -> dict:
+        """Budget left per key (by position in the key list) and in total"""
+        with self._lock:
+            now = time.monotonic()
+            keys = {}
+            for index, state in enumerate(self._keys):
+                state.second.refill(now)
+                state.day.refill(now)
+                keys[str(index)] = {
+                    "key": f"...{state.key[-4:]}",
+                    "per_second": round(state.second.tokens, 2),
+                    "per_day": int(state.day.tokens),
+                    "cooldown": max(0.0, round(state.cooldown_until - now, 1)),
+                    "requests": state.requests,
+                    "errors": state.errors,
+                }
+            return {
+                "keys": keys,
+                "active_keys": self._active(),
+                "per_day_total": sum(v["per_day"] for v in keys.values()),
+            }
+
+
+def _configured_keys():
+    """ETHERSCAN_API_KEYS (comma-separated) plus the single ETHERSCAN_API_KEY"""
+    keys = [k.strip() for k in (config.get("ETHERSCAN_API_KEYS") or "").split(",")]
+    keys.append(config.get("ETHERSCAN_API_KEY") or "")
+    return [k for k in keys if k]
+
+
+key_manager = ApiKeyManager(_configured_keys())
+
+metrics.Gauge("gasbot_api_key_budget_remaining", "Requests left in each Etherscan key's daily budget", ("key",),
+              function=lambda: {index: v["per_day"] for index, v in key_manager.remaining()["keys"].items()})
+metrics.Gauge("gasbot_api_key_cooldown_seconds", "Seconds until a benched Etherscan key is back in rotation", ("key",),
+              function=lambda: {index: v["cooldown"] for index, v in key_manager.remaining()["keys"].items()})
@@ -0,0 +1,226 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from config.api_keys import config
+
+# Off by default; when off every metric call returns immediately
+METRICS_ENABLED = (config.get("METRICS_ENABLED") or "").lower() in ("1", "true", "yes")
+METRICS_LISTEN = config.get("METRICS_LISTEN") or "0.0.0.0"
+METRICS_PORT = int(config.get("METRICS_PORT") or 9108)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+_registry = []
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                    for k, v in pairs)
+    return "{" + body + "}"
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labels=(), function=None):
+        super().__init__(name, help, labels)
+        self.function = function
+
+    def set(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self):
+        if self.function is not None and METRICS_ENABLED:
+            # Labelled gauges take {label value or tuple of them: value}
+            try:
+                value = self.function()
+                if self.labelnames:
+                    values = {k if isinstance(k, tuple) else (k,): v for k, v in value.items()}
+                else:
+                    values = {(): value}
+                with self._lock:
+                    self._values = values
+            except Exception:
+                pass
+        return super().render()
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                state[0][i] += 1
+            state[1] += 1
+            state[2] += value
+
+    @contextmanager
+    def _timer(self, labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def time(self, **labels):
+        """Context manager observing the elapsed time of its block"""
+        if not METRICS_ENABLED:
+            return nullcontext()
+        return self._timer(labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = [(key, (list(s[0]), s[1], s[2])) for key, s in self._values.items()]
+        for key, (counts, count, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', bound))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+def timed(histogram: Histogram, **labels):
+    """Decorator timing a function into a histogram. Free when metrics are disabled"""
+    def decorator(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
+
+
+def timed_query(statement: str):
+    """Time a repository method as one SQLite statement"""
+    return timed(sqlite_query_seconds, statement=statement)
+
+
+def instrument_handler(name: str, handler, label=None):
+    """Wrap a PTB callback to record its latency; label(update) refines the handler label"""
+    if not METRICS_ENABLED:
+        return handler
+
+    @functools.wraps(handler)
+    async def wrapper(update, context):
+        start = time.perf_counter()
+        try:
+            return await handler(update, context)
+        finally:
+            handler_seconds.observe(time.perf_counter() - start, handler=label(update) if label else name)
+    return wrapper
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(listen: str = METRICS_LISTEN, port: int = METRICS_PORT):
+    """Serve the Prometheus text format on /metrics from a background thread"""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            payload = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    # One thread serves every scrape, so gauges that read SQLite reuse one connection
+    server = HTTPServer((listen, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+# Hot-path metrics
+gas_fetch_seconds = Histogram("gasbot_gas_fetch_seconds", "Upstream gas price fetch latency", ("chain", "provider"))
+gas_cache_lookups = Counter("gasbot_gas_cache_lookups_total",
+                            "Gas cache lookups by result (hit, miss, stale, coalesced)", ("result",))
+gas_fetch_errors = Counter("gasbot_gas_fetch_errors_total", "Failed upstream gas price fetches", ("chain", "provider"))
+alert_cycle_seconds = Histogram("gasbot_alert_cycle_seconds", "Duration of one alert check cycle")
+alerts_evaluated = Histogram("gasbot_alerts_evaluated", "Armed alerts evaluated per cycle", buckets=COUNT_BUCKETS)
+alerts_fired = Histogram("gasbot_alerts_fired", "Alerts fired per cycle", buckets=COUNT_BUCKETS)
+digest_alerts = Histogram("gasbot_digest_alerts", "Alerts folded into each notification message", buckets=COUNT_BUCKETS)
+notification_send_seconds = Histogram("gasbot_notification_send_seconds", "Telegram send_message latency")
+notifications = Counter("gasbot_notifications_total", "Alert notifications by outcome", ("result",))
+notification_rate_limited = Counter("gasbot_notification_rate_limited_total", "Telegram 429 RetryAfter responses")
+shard_restarts = Counter("gasbot_shard_restarts_total", "Alert shard workers restarted after dying")
+gas_history_dropped = Counter("gasbot_gas_history_dropped_total", "Gas samples dropped because the history writer fell behind")
+sqlite_query_seconds = Histogram("gasbot_sqlite_query_seconds", "SQLite statement latency", ("statement",))
+handler_seconds = Histogram("gasbot_handler_seconds", "Telegram handler latency", ("handler",))
@@ -0,0 +1,316 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable, NamedTuple, Optional
+from telegram import Bot
+from telegram.error import RetryAfter, TimedOut, NetworkError
+from config.api_keys import config
+from core import metrics
+
+# Telegram limits: ~30 messages/s overall, ~1 message/s per chat, 20 messages/min per group
+GLOBAL_RATE = float(config.get("NOTIFY_GLOBAL_RATE") or 25)
+CHAT_RATE = 1.0
+GROUP_RATE = 20 / 60
+NOTIFY_CONCURRENCY = int(config.get("NOTIFY_CONCURRENCY") or 8)
+MAX_ATTEMPTS = 5
+# How long shutdown waits for queued notifications to go out before giving up on them (seconds)
+NOTIFY_DRAIN_TIMEOUT = float(config.get("NOTIFY_DRAIN_TIMEOUT") or 10)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursting up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for a while (e.g. after a 429)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def try_acquire(self) -> float:
+        """Take a token if one is free and return 0, otherwise return the seconds until one is"""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    @property
+    def idle(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class Notification(NamedTuple):
+    chat_id: int
+    text: str
+    on_sent: Optional[Callable[[], None]] = None
+    on_failed: Optional[Callable[[Exception], None]] = None
+    attempt: int = 0
+    chat_token: bool = False  # already holds a token from its chat's bucket
+
+
+class NotificationDispatcher:
+    """
+    Sends alert messages from the bot's own event loop with bounded concurrency.
+    A global token bucket and per-chat buckets keep us under Telegram's limits,
+    and 429 RetryAfter responses pause sending and requeue the message instead of
+    dropping it. submit() is thread-safe, so the scheduler thread can use it.
+
+    A worker only takes on a notification whose chat has a token. The others
+    wait, in order, in a per-chat queue and are put back on the main queue by
+    a timer once their chat's bucket refills. A long digest to one slow group
+    therefore never ties up the workers that serve every other chat.
+
+    Shutdown drains the queue for a while; anything still queued or cancelled
+    mid-send after that is handed to its on_failed callback, so its alert is
+    re-armed instead of being left in flight.
+    """
+
+    def __init__(self, concurrency: int = NOTIFY_CONCURRENCY, global_rate: float = GLOBAL_RATE):
+        self.concurrency = concurrency
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_buckets = {}
+        self._waiting = {}   # chat_id -> deque of notifications held back by the chat's limit
+        self._timers = {}    # chat_id -> timer releasing the head of its waiting queue
+        self.bot = None
+        self.loop = None
+        self.queue = None
+        self._workers = []
+        self._recent = deque()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.rate_limited = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self, bot: Bot):
+        self.bot = bot
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def drain(self, timeout: float = NOTIFY_DRAIN_TIMEOUT) -> bool:
+        """Wait up to timeout seconds for every queued notification to be handled"""
+        if self.queue is None:
+            return True
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning("Notifications still queued at shutdown", extra={"queue_depth": self.queue.qsize()})
+            return False
+
+    async def stop(self):
+        """Stop the workers. Notifications not sent by then are reported as failed"""
+        workers, self._workers = self._workers, []
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        # Let submit() calls already scheduled from other threads land in the queue
+        await asyncio.sleep(0)
+        abandoned = 0
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for waiting in self._waiting.values():
+            for notification in waiting:
+                self._abandon(notification)
+                self.queue.task_done()
+                abandoned += 1
+        self._waiting.clear()
+        while self.queue is not None and not self.queue.empty():
+            self._abandon(self.queue.get_nowait())
+            self.queue.task_done()
+            abandoned += 1
+        if abandoned:
+            logger.warning("Unsent notifications returned at shutdown", extra={"abandoned": abandoned})
+
+    def _abandon(self, notification: Notification):
+        metrics.notifications.inc(result="abandoned")
+        if notification.on_failed:
+            try:
+                notification.on_failed(RuntimeError("Notification dispatcher stopped before sending"))
+            except Exception:
+                logger.exception("Error in notification failure callback")
+
+    def submit(self, chat_id: int, text: str, on_sent=None, on_failed=None):
+        """Queue a message for delivery. Safe to call from any thread"""
+        if not self.running:
+            raise RuntimeError("Notification dispatcher is not running")
+        notification = Notification(chat_id, text, on_sent, on_failed)
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, notification)
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            # Negative chat ids are groups/channels, which have a stricter limit
+            rate = GROUP_RATE if chat_id < 0 else CHAT_RATE
+            bucket = self.chat_buckets[chat_id] = TokenBucket(rate, capacity=1)
+            if len(self.chat_buckets) > 10000:
+                self._prune_chat_buckets()
+        return bucket
+
+    def _prune_chat_buckets(self):
+        for chat_id in [c for c, b in self.chat_buckets.items() if b.idle and c not in self._waiting]:
+            del self.chat_buckets[chat_id]
+
+    def _hold(self, notification: Notification, delay: float):
+        """
+        Park a notification until its chat has a token. It stays unfinished in
+        the queue's count, so drain() still waits for it.
+        """
+        chat_id = notification.chat_id
+        waiting = self._waiting.get(chat_id)
+        if waiting is None:
+            waiting = self._waiting[chat_id] = deque()
+            self._timers[chat_id] = self.loop.call_later(delay, self._release, chat_id)
+        waiting.append(notification)
+
+    def _release(self, chat_id: int):
+        """Timer callback: hand the chat's oldest waiting notification back to the workers"""
+        waiting = self._waiting.get(chat_id)
+        if not waiting:
+            self._timers.pop(chat_id, None)
+            return
+        bucket = self._chat_bucket(chat_id)
+        delay = bucket.try_acquire()
+        if delay:
+            self._timers[chat_id] = self.loop.call_later(delay, self._release, chat_id)
+            return
+        notification = waiting.popleft()
+        if waiting:
+            self._timers[chat_id] = self.loop.call_later(1 / bucket.rate, self._release, chat_id)
+        else:
+            del self._waiting[chat_id]
+            del self._timers[chat_id]
+        # put + task_done keeps the unfinished count unchanged while it moves back
+        self.queue.put_nowait(notification._replace(chat_token=True))
+        self.queue.task_done()
+
+    async def _worker(self):
+        while True:
+            notification = await self.queue.get()
+            if not notification.chat_token:
+                if notification.chat_id in self._waiting:
+                    # Keep the chat's messages in order behind the ones already waiting
+                    self._hold(notification, 0)
+                    continue
+                delay = self._chat_bucket(notification.chat_id).try_acquire()
+                if delay:
+                    self._hold(notification, delay)
+                    continue
+            try:
+                await self._deliver(notification)
+            except asyncio.CancelledError:
+                # Stopped mid-send: it may not have gone out, so hand it back
+                self._abandon(notification)
+                raise
+            except Exception:
+                logger.exception("Notification worker error")
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, notification: Notification):
+        await self.global_bucket.acquire()
+        try:
+            with metrics.notification_send_seconds.time():
+                await self.bot.send_message(
+                    chat_id=notification.chat_id,
+                    text=notification.text,
+                    parse_mode='Markdown'
+                )
+        except RetryAfter as e:
+            self.rate_limited += 1
+            metrics.notification_rate_limited.inc()
+            delay = e.retry_after
+            delay = delay.total_seconds() if hasattr(delay, "total_seconds") else float(delay)
+            logger.warning("⏳ Rate limited by Telegram, backing off", extra={"retry_after": delay})
+            self.global_bucket.pause(delay)
+            self._retry(notification)
+            return
+        except (TimedOut, NetworkError) as e:
+            if notification.attempt + 1 < MAX_ATTEMPTS:
+                await asyncio.sleep(2 ** notification.attempt)
+                self._retry(notification)
+                return
+            self._fail(notification, e)
+            return
+        except Exception as e:
+            self._fail(notification, e)
+            return
+
+        self.sent += 1
+        metrics.notifications.inc(result="sent")
+        self._recent.append(time.monotonic())
+        if notification.on_sent:
+            notification.on_sent()
+
+    def _retry(self, notification: Notification):
+        self.retried += 1
+        metrics.notifications.inc(result="retried")
+        self.queue.put_nowait(notification._replace(attempt=notification.attempt + 1, chat_token=False))
+
+    def _fail(self, notification: Notification, error: Exception):
+        self.failed += 1
+        metrics.notifications.inc(result="failed")
+        logger.error("Error sending message", extra={"chat_id": notification.chat_id, "error": str(error)})
+        if notification.on_failed:
+            notification.on_failed(error)
+
+    def sent_per_second(self, window: float = 10.0) -> float:
+        cutoff = time.monotonic() - window
+        while self._recent and self._recent[0] < cutoff:
+            self._recent.popleft()
+        return len(self._recent) / window
+
+    @property
+    def held(self) -> int:
+        """Notifications waiting for their chat's rate limit"""
+        return sum(len(waiting) for waiting in self._waiting.values())
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": (self.queue.qsize() if self.queue else 0) + self.held,
+            "sent": self.sent,
+            "sent_per_second": self.sent_per_second(),
+            "failed": self.failed,
+            "retried": self.retried,
+            "rate_limited": self.rate_limited,
+        }
+
+
+notification_dispatcher = NotificationDispatcher()
+
+metrics.Gauge("gasbot_notification_queue_depth", "Alert notifications waiting to be sent",
+              function=lambda: notification_dispatcher.stats()["queue_depth"])
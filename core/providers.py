@@ -0,0 +1,317 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+import httpx
+from config.api_keys import config
+from config.chains import chains as chain_registry
+from core import metrics
+from core.gas_tracker import get_gas_price, get_gas_price_async, get_async_client, REQUEST_TIMEOUT
+
+# Provider priority, highest first (names from PROVIDER_TYPES)
+GAS_PROVIDERS = [p.strip() for p in (config.get("GAS_PROVIDERS") or "etherscan,rpc").split(",") if p.strip()]
+# JSON-RPC endpoints per chain id, e.g. "1=https://eth.llamarpc.com,56=https://bsc-dataseed.bnbchain.org"
+RPC_URLS = dict(
+    (int(chainid), url.strip())
+    for chainid, url in (item.split("=", 1) for item in (config.get("RPC_URLS") or "").split(",") if "=" in item)
+)
+# Fire the next provider if the current one hasn't answered within this many seconds.
+# Off (0) by default: every hedge is an extra upstream call against the key budget
+HEDGE_DELAY = float(config.get("HEDGE_DELAY_MS") or 0) / 1000
+# Providers slower than this (EWMA, seconds) or failing more often than this are demoted
+DEMOTE_LATENCY = float(config.get("PROVIDER_DEMOTE_LATENCY_MS") or 2000) / 1000
+DEMOTE_ERROR_RATE = 0.5
+# A demoted provider gets another chance as primary once it has gone this long without a sample
+DEMOTE_PERIOD = 60
+EWMA_ALPHA = 0.2
+
+WEI_PER_GWEI = 10 ** 9
+
+logger = logging.getLogger(__name__)
+
+
+class GasProvider:
+    """
+    A source of gas prices. fetch()/afetch() return {"low", "medium", "high"}
+    in Gwei, or {"error": message}, like get_gas_price.
+    """
+    name = "base"
+
+    def supports(self, chainid: int) -> bool:
+        return True
+
+    def fetch(self, chainid: int) -> dict:
+        raise NotImplementedError
+
+    async def afetch(self, chainid: int) -> dict:
+        return await asyncio.to_thread(self.fetch, chainid)
+
+
+class EtherscanProvider(GasProvider):
+    """Etherscan v2 gas oracle"""
+    name = "etherscan"
+
+    def fetch(self, chainid: int) -> dict:
+        return get_gas_price(chainid)
+
+    async def afetch(self, chainid: int) -> dict:
+        return await get_gas_price_async(chainid)
+
+
+class JsonRpcProvider(GasProvider):
+    """
+    Any node's JSON-RPC endpoint. Prices come from eth_feeHistory (next base fee
+    plus the 25th/50th/90th percentile priority fees of recent blocks), falling
+    back to eth_gasPrice on chains without EIP-1559.
+    """
+    name = "rpc"
+
+    def __init__(self, urls: dict = None):
+        self.urls = RPC_URLS if urls is None else urls
+
+    def supports(self, chainid: int) -> bool:
+        return chainid in self.urls
+
+    @staticmethod
+    def _payload():
+        return [
+            {"jsonrpc": "2.0", "id": 1, "method": "eth_feeHistory", "params": ["0x5", "latest", [25, 50, 90]]},
+            {"jsonrpc": "2.0", "id": 2, "method": "eth_gasPrice", "params": []},
+        ]
+
+    @staticmethod
+    def _parse(responses) -> dict:
+        by_id = {r.get("id"): r for r in responses}
+        history = by_id.get(1, {}).get("result")
+        if history and history.get("reward"):
+            base_fee = int(history["baseFeePerGas"][-1], 16)
+            rewards = history["reward"]
+            levels = []
+            for i in range(3):
+                tip = sum(int(block[i], 16) for block in rewards) / len(rewards)
+                levels.append((base_fee + tip) / WEI_PER_GWEI)
+            return {"low": levels[0], "medium": levels[1], "high": levels[2]}
+        gas_price = by_id.get(2, {}).get("result")
+        if gas_price:
+            price = int(gas_price, 16) / WEI_PER_GWEI
+            return {"low": price, "medium": price, "high": price}
+        error = by_id.get(2, {}).get("error") or by_id.get(1, {}).get("error") or "Unknown error"
+        return {"error": str(error)}
+
+    def fetch(self, chainid: int) -> dict:
+        try:
+            response = requests.post(self.urls[chainid], json=self._payload(), timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            return self._parse(response.json())
+        except (requests.exceptions.RequestException, ValueError, KeyError, TypeError) as e:
+            return {"error": str(e)}
+
+    async def afetch(self, chainid: int) -> dict:
+        try:
+            response = await get_async_client().post(self.urls[chainid], json=self._payload())
+            response.raise_for_status()
+            return self._parse(response.json())
+        except (httpx.HTTPError, ValueError, KeyError, TypeError) as e:
+            return {"error": str(e)}
+
+
+class StubProvider(GasProvider):
+    """
+    Local provider for tests and benchmarks. `prices` maps chain id to a Gwei
+    value or a {"low", "medium", "high"} dict; `delay` simulates latency.
+    """
+    name = "stub"
+
+    def __init__(self, prices: dict = None, delay: float = 0.0):
+        self.prices = prices if prices is not None else {}
+        self.delay = delay
+        self.calls = 0
+
+    def supports(self, chainid: int) -> bool:
+        return chainid in self.prices
+
+    def _result(self, chainid: int) -> dict:
+        self.calls += 1
+        price = self.prices[chainid]
+        if isinstance(price, dict):
+            return dict(price)
+        return {"low": price, "medium": price, "high": price}
+
+    def fetch(self, chainid: int) -> dict:
+        if self.delay:
+            time.sleep(self.delay)
+        return self._result(chainid)
+
+    async def afetch(self, chainid: int) -> dict:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self._result(chainid)
+
+
+PROVIDER_TYPES = {
+    "etherscan": EtherscanProvider,
+    "rpc": JsonRpcProvider,
+    "stub": StubProvider,
+}
+
+
+class _ProviderStats:
+    __slots__ = ("latency", "error_rate", "requests", "errors", "wins", "updated")
+
+    def __init__(self):
+        self.updated = 0.0
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.wins = 0
+
+    def record(self, elapsed: float, ok: bool):
+        self.updated = time.monotonic()
+        self.requests += 1
+        self.errors += 0 if ok else 1
+        if self.requests == 1:
+            self.latency = elapsed
+            self.error_rate = 0.0 if ok else 1.0
+        else:
+            self.latency = EWMA_ALPHA * elapsed + (1 - EWMA_ALPHA) * self.latency
+            self.error_rate = EWMA_ALPHA * (0.0 if ok else 1.0) + (1 - EWMA_ALPHA) * self.error_rate
+
+    @property
+    def demoted(self) -> bool:
+        unhealthy = self.latency > DEMOTE_LATENCY or self.error_rate > DEMOTE_ERROR_RATE
+        return unhealthy and time.monotonic() - self.updated < DEMOTE_PERIOD
+
+
+class ProviderRouter:
+    """
+    Tries providers in priority order until one answers. With a hedge_delay set,
+    requests are hedged: if the current provider hasn't answered within it, the
+    next one is fired too and whichever succeeds first wins. Latency and error rate are
+    tracked per provider, and slow or failing providers drop behind healthy ones.
+    """
+
+    def __init__(self, providers, hedge_delay: float = HEDGE_DELAY):
+        self.providers = list(providers)
+        self.hedge_delay = hedge_delay
+        self.stats_by_name = {p.name: _ProviderStats() for p in self.providers}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="gas-provider")
+
+    def ordered(self, chainid: int):
+        """Providers for a chain, healthy ones first, each group in priority order"""
+        entry = chain_registry.by_id(chainid)
+        allowed = entry.providers if entry is not None and entry.providers else None
+        candidates = [p for p in self.providers
+                      if p.supports(chainid) and (allowed is None or p.name in allowed)]
+        return sorted(candidates, key=lambda p: self.stats_by_name[p.name].demoted)
+
+    def _record(self, provider, started: float, result: dict, chainid: int = None) -> dict:
+        elapsed = time.monotonic() - started
+        ok = 'error' not in result
+        with self._lock:
+            self.stats_by_name[provider.name].record(elapsed, ok)
+        if chainid is not None:
+            metrics.gas_fetch_seconds.observe(elapsed, chain=chainid, provider=provider.name)
+            if not ok:
+                metrics.gas_fetch_errors.inc(chain=chainid, provider=provider.name)
+        return result
+
+    def _call(self, provider, chainid: int) -> dict:
+        started = time.monotonic()
+        try:
+            result = provider.fetch(chainid)
+        except Exception as e:
+            result = {"error": str(e)}
+        return self._record(provider, started, result, chainid)
+
+    async def _acall(self, provider, chainid: int) -> dict:
+        started = time.monotonic()
+        try:
+            result = await provider.afetch(chainid)
+        except asyncio.CancelledError:
+            # Lost a hedged race: no answer, so neither a success nor a failure
+            raise
+        except Exception as e:
+            result = {"error": str(e)}
+        return self._record(provider, started, result, chainid)
+
+    def _win(self, provider):
+        with self._lock:
+            self.stats_by_name[provider.name].wins += 1
+
+    def fetch(self, chainid: int) -> dict:
+        providers = self.ordered(chainid)
+        if not providers:
+            return {"error": f"No gas price provider for chain {chainid}"}
+        pending = {}
+        errors = []
+        queue = list(providers)
+        while queue or pending:
+            if queue:
+                provider = queue.pop(0)
+                pending[self._pool.submit(self._call, provider, chainid)] = provider
+            timeout = self.hedge_delay if queue and self.hedge_delay > 0 else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = pending.pop(future)
+                result = future.result()
+                if 'error' not in result:
+                    self._win(provider)
+                    return result
+                errors.append(f"{provider.name}: {result['error']}")
+        return {"error": "; ".join(errors)}
+
+    async def afetch(self, chainid: int) -> dict:
+        providers = self.ordered(chainid)
+        if not providers:
+            return {"error": f"No gas price provider for chain {chainid}"}
+        pending = {}
+        errors = []
+        queue = list(providers)
+        try:
+            while queue or pending:
+                if queue:
+                    provider = queue.pop(0)
+                    pending[asyncio.ensure_future(self._acall(provider, chainid))] = provider
+                timeout = self.hedge_delay if queue and self.hedge_delay > 0 else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    provider = pending.pop(task)
+                    result = task.result()
+                    if 'error' not in result:
+                        self._win(provider)
+                        return result
+                    errors.append(f"{provider.name}: {result['error']}")
+        finally:
+            for task in pending:
+                task.cancel()
+        return {"error": "; ".join(errors)}
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "latency_ms": round(s.latency * 1000, 1),
+                "error_rate": round(s.error_rate, 3),
+                "requests": s.requests,
+                "errors": s.errors,
+                "wins": s.wins,
+                "demoted": s.demoted,
+            }
+            for name, s in self.stats_by_name.items()
+        }
+
+
+def build_router(names=GAS_PROVIDERS) -> ProviderRouter:
+    providers = []
+    for name in names:
+        if name not in PROVIDER_TYPES:
+            logger.warning("⚠️ Unknown gas provider - ignoring", extra={"provider": name})
+            continue
+        providers.append(PROVIDER_TYPES[name]())
+    return ProviderRouter(providers)
+
+
+provider_router = build_router()
@@ -1,27 +1,195 @@
-from apscheduler.schedulers.background import BackgroundScheduler
-from core.alert_manager import check_alerts_and_notify
-from telegram.ext import Application
+from config.chains import chains as chain_registry
+from core.alert_manager import check_alerts_and_notify, get_active_chains
+from core.alert_index import alert_index
+from core.gas_cache import gas_cache, GAS_CACHE_TTL
+from config.api_keys import config
+from telegram.ext import Application, ContextTypes
+from core.archiver import alert_archiver, ARCHIVE_INTERVAL
+from core import metrics
+import asyncio
+import logging
+import threading
 import time
 
-def start_scheduler(app: Application):
+logger = logging.getLogger(__name__)
+
+# Global upstream request budget shared by every chain (Etherscan free tier: 5/s, 100k/day)
+POLL_BUDGET_PER_SECOND = float(config.get("POLL_BUDGET_PER_SECOND") or 1)
+POLL_BUDGET_PER_DAY = float(config.get("POLL_BUDGET_PER_DAY") or 50000)
+# Bounds for each chain's polling interval (seconds)
+MIN_POLL_INTERVAL = float(config.get("MIN_POLL_INTERVAL") or GAS_CACHE_TTL)
+MAX_POLL_INTERVAL = float(config.get("MAX_POLL_INTERVAL") or 600)
+# How often the scheduler looks for chains that are due (seconds)
+TICK_INTERVAL = 5
+# Poll again after this fraction of the expected time for the price to reach the nearest threshold
+SAFETY_FACTOR = 0.5
+# Weight of the newest sample in the volatility moving average
+VOLATILITY_ALPHA = 0.3
+
+
+class AdaptivePoller:
     """
-    Start the background scheduler for gas price monitoring.
-    Uses 2-minute intervals to respect API rate limits.
+    Polls each chain with active alerts on its own schedule.
+
+    After every poll, a chain's next interval is derived from how fast its
+    price has been moving (an EWMA of relative change per second) and how far
+    the price is from the nearest armed threshold: volatile chains close to a
+    threshold are polled often, quiet chains far from any threshold rarely.
+    All polls draw from one token bucket sized from the per-second and per-day
+    request budget, which is also charged for requests made by the handlers.
     """
-    scheduler = BackgroundScheduler()
-    
-    # Check every 2 minutes instead of 10 seconds to respect API rate limits
-    # This gives us 30 requests per hour instead of 360 requests per hour
-    scheduler.add_job(
-        lambda: check_alerts_and_notify(app.bot), 
-        "interval", 
-        minutes=2,
-        id="gas_price_check",
-        name="Gas Price Alert Check"
-    )
-    
-    scheduler.start()
-    print("✅ Scheduler started successfully!")
-    print("📊 Checking gas prices every 2 minutes (30 times/hour)")
-    print("💡 This respects API rate limits while maintaining responsiveness")
 
+    def __init__(self, budget_per_second: float = POLL_BUDGET_PER_SECOND,
+                 budget_per_day: float = POLL_BUDGET_PER_DAY,
+                 min_interval: float = MIN_POLL_INTERVAL, max_interval: float = MAX_POLL_INTERVAL):
+        self.rate = min(budget_per_second, budget_per_day / 86400)
+        self.capacity = max(1.0, budget_per_second * TICK_INTERVAL)
+        self.tokens = self.capacity
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.next_poll = {}   # chain -> monotonic time of next poll
+        self.intervals = {}   # chain -> current polling interval (seconds)
+        self.volatility = {}  # chain -> EWMA of |relative price change| per second
+        self._last = {}       # chain -> (price, fetched_at)
+        self._updated = time.monotonic()
+        self._requests_seen = gas_cache.requests
+        self._lock = threading.Lock()
+        # Runs one alert check for the given chains (replaced in sharded mode)
+        self.cycle = check_alerts_and_notify
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        # Charge for every upstream request, including those made by the handlers
+        requests = gas_cache.requests
+        self.tokens -= requests - self._requests_seen
+        self._requests_seen = requests
+
+    def tick(self):
+        """Poll the chains that are due, as far as the request budget allows"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            active = get_active_chains()
+            for chain in list(self.next_poll):
+                if chain not in active:
+                    self._forget(chain)
+
+            due = sorted(
+                (chain for chain in active if self.next_poll.get(chain, 0) <= now),
+                key=lambda chain: self.next_poll.get(chain, 0)
+            )
+            allowed = due[:max(0, int(self.tokens))]
+            if len(allowed) < len(due):
+                logger.warning("⏳ Request budget exhausted - deferring", extra={"chains": due[len(allowed):]})
+            if not allowed:
+                return
+
+            stats = self.cycle(chains=allowed) or {}
+            failed = stats.get("failed_chains") or {}
+            self._refill(time.monotonic())
+            for chain in allowed:
+                self._reschedule(chain, now, failed=chain in failed)
+
+    def _forget(self, chain: str):
+        for state in (self.next_poll, self.intervals, self.volatility, self._last):
+            state.pop(chain, None)
+
+    def _bounds(self, chain: str):
+        """Polling interval bounds for a chain, from the chain registry or the defaults"""
+        entry = chain_registry.get(chain)
+        if entry is None:
+            return self.min_interval, self.max_interval
+        return (entry.min_poll_interval or self.min_interval,
+                entry.max_poll_interval or self.max_interval)
+
+    def _reschedule(self, chain: str, now: float, failed: bool = False):
+        entry = chain_registry.get(chain)
+        snapshot = gas_cache.peek(entry.id) if entry else None
+        min_interval, max_interval = self._bounds(chain)
+        if failed or snapshot is None:
+            # Fetch failed: back off rather than plan around an old price
+            interval = min(max_interval, self.intervals.get(chain, min_interval) * 2)
+        else:
+            price = snapshot.current
+            self._update_volatility(chain, price, snapshot.fetched_at)
+            interval = self._interval_for(chain, price)
+
+        interval = self._fit_budget(chain, interval)
+        if self.intervals.get(chain) != interval:
+            logger.info("⏱️ Polling interval changed", extra={"chain": chain, "interval": round(interval)})
+        self.intervals[chain] = interval
+        self.next_poll[chain] = now + interval
+
+    def _update_volatility(self, chain: str, price: float, fetched_at: float):
+        last = self._last.get(chain)
+        self._last[chain] = (price, fetched_at)
+        if last is None or fetched_at <= last[1] or last[0] <= 0:
+            return
+        change = abs(price - last[0]) / last[0] / (fetched_at - last[1])
+        previous = self.volatility.get(chain)
+        self.volatility[chain] = change if previous is None else (
+            VOLATILITY_ALPHA * change + (1 - VOLATILITY_ALPHA) * previous
+        )
+
+    def _interval_for(self, chain: str, price: float) -> float:
+        nearest = alert_index.nearest_threshold(chain, price)
+        volatility = self.volatility.get(chain)
+        min_interval, max_interval = self._bounds(chain)
+        if nearest is None or price <= 0:
+            # Nothing left below the current price to cross
+            return max_interval
+        if not volatility:
+            # No movement seen yet: start in the middle of the range
+            return (min_interval + max_interval) / 2
+        gap = (price - nearest) / price
+        time_to_cross = gap / volatility
+        return max(min_interval, min(max_interval, time_to_cross * SAFETY_FACTOR))
+
+    def _fit_budget(self, chain: str, interval: float) -> float:
+        """Stretch the interval if all chains together would poll faster than the budget"""
+        others = sum(1 / i for c, i in self.intervals.items() if c != chain)
+        total_rate = others + 1 / interval
+        if total_rate > self.rate:
+            interval = min(self._bounds(chain)[1], interval * total_rate / self.rate)
+        return interval
+
+    def stats(self) -> dict:
+        return {
+            "intervals": dict(self.intervals),
+            "volatility": dict(self.volatility),
+            "budget_tokens": self.tokens,
+            "budget_rate": self.rate,
+        }
+
+
+poller = AdaptivePoller()
+
+metrics.Gauge("gasbot_poll_interval_seconds", "Polling interval currently chosen for each chain", ("chain",),
+              function=lambda: dict(poller.stats()["intervals"]))
+metrics.Gauge("gasbot_poll_budget_tokens", "Request budget the poller had left at its last tick",
+              function=lambda: poller.stats()["budget_tokens"])
+
+
+async def _poll_job(context: ContextTypes.DEFAULT_TYPE):
+    # tick() does blocking fetches and SQLite writes, so it runs off the event loop
+    await asyncio.to_thread(poller.tick)
+
+
+async def _archive_job(context: ContextTypes.DEFAULT_TYPE):
+    await asyncio.to_thread(alert_archiver.run_once)
+
+
+def start_scheduler(app: Application):
+    """
+    Schedule the periodic work on the bot's JobQueue, inside its event loop.
+    Each chain is polled on its own adaptive interval within the request budget;
+    the first tick runs as soon as the application starts.
+    """
+    app.job_queue.run_repeating(_poll_job, interval=TICK_INTERVAL, first=0, name="gas_price_check")
+    app.job_queue.run_repeating(_archive_job, interval=ARCHIVE_INTERVAL, name="alert_archive")
+    logger.info("✅ Scheduler started successfully!", extra={
+        "min_interval": MIN_POLL_INTERVAL,
+        "max_interval": MAX_POLL_INTERVAL,
+        "budget_per_second": round(poller.rate, 2),
+    })
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import time
+from config.api_keys import config
+from core import metrics
+from core.alert_index import alert_index, Alert
+from core.alert_manager import fetch_chain_prices, get_active_chains, evaluate_prices
+from data.repository import alerts_repo
+
+# Number of alert worker processes (0 or 1 keeps evaluation in the bot process)
+ALERT_SHARDS = int(config.get("ALERT_SHARDS") or 0)
+# How many times a dead worker is restarted before the coordinator gives up
+SHARD_MAX_RESTARTS = int(config.get("SHARD_MAX_RESTARTS") or 5)
+
+logger = logging.getLogger(__name__)
+
+
+def shard_for(chat_id: int, num_shards: int) -> int:
+    """
+    Owning shard of a chat. Deterministic (no stored state), so assignment
+    survives restarts as long as ALERT_SHARDS is unchanged; it matches the
+    SQL used by AlertRepository.get_armed_alerts_for_shard.
+    """
+    return abs(chat_id) % num_shards
+
+
+def _worker_main(shard: int, num_shards: int, inbox, outbox):
+    """Entry point of a worker process"""
+    from core.log import setup_logging
+    setup_logging()
+    try:
+        asyncio.run(_worker_loop(shard, num_shards, inbox, outbox))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_loop(shard: int, num_shards: int, inbox, outbox):
+    # Imported here so they're created inside the worker process
+    from telegram import Bot
+    from data.repository import alerts_repo
+    from core.notifier import NotificationDispatcher, GLOBAL_RATE
+    from core.delivery_state import delivery_state
+
+    alert_index.rebuild(Alert(*row) for row in alerts_repo.get_armed_alerts_for_shard(shard, num_shards))
+    # Tell the coordinator about alerts this worker triggers or re-arms
+    alert_index.listeners.append(lambda event, alert: outbox.put((event, tuple(alert))))
+
+    # Same Bot API server as the bot process (bench/ points it at a fake one)
+    options = {}
+    if config.get("TELEGRAM_API_BASE_URL"):
+        options["base_url"] = config["TELEGRAM_API_BASE_URL"]
+    bot = Bot(config["TELEGRAM_BOT_TOKEN"], **options)
+    await bot.initialize()
+    delivery_state.start()
+    # The shards share Telegram's global limit between them
+    notification_dispatcher = NotificationDispatcher(global_rate=GLOBAL_RATE / num_shards)
+    await notification_dispatcher.start(bot)
+    logger.info("🧩 Alert shard ready", extra={"shard": shard, "shards": num_shards, "armed_alerts": len(alert_index)})
+
+    try:
+        while True:
+            event, payload = await asyncio.to_thread(inbox.get)
+            if event == "prices":
+                await asyncio.to_thread(evaluate_prices, payload, notification_dispatcher)
+            elif event == "add":
+                alert_index.add(Alert(*payload))
+            elif event == "remove":
+                alert_index.remove(payload[0])
+            elif event == "stop":
+                break
+        await notification_dispatcher.drain()
+    finally:
+        await notification_dispatcher.stop()
+        delivery_state.stop()
+        await bot.shutdown()
+
+
+class ShardCoordinator:
+    """
+    Runs alert evaluation in worker processes, each owning the alerts of the
+    chats that hash to it. The coordinator fetches price snapshots once per
+    cycle and broadcasts them; workers evaluate and dispatch their own shard.
+    Index changes made in the bot process (new or deleted alerts) are
+    forwarded to the owning worker, and alerts a worker triggers or re-arms
+    are reported back so the bot process's index stays in step.
+
+    Workers are checked before every broadcast. A dead one is restarted (it
+    reloads its shard from the database) up to SHARD_MAX_RESTARTS times, after
+    which cycles fail with an error rather than feeding a dead queue.
+    """
+
+    def __init__(self, num_shards: int = ALERT_SHARDS):
+        self.num_shards = num_shards
+        self.inboxes = []
+        self.outbox = None
+        self.processes = []
+        self.restarts = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.num_shards > 1
+
+    def start(self):
+        self.outbox = multiprocessing.get_context("spawn").Queue()
+        for shard in range(self.num_shards):
+            inbox, process = self._spawn(shard)
+            self.inboxes.append(inbox)
+            self.processes.append(process)
+        alert_index.listeners.append(self._forward)
+        logger.info("✅ Started alert shard workers", extra={"shards": self.num_shards})
+
+    def _spawn(self, shard: int):
+        ctx = multiprocessing.get_context("spawn")
+        inbox = ctx.Queue()
+        process = ctx.Process(
+            target=_worker_main,
+            args=(shard, self.num_shards, inbox, self.outbox),
+            name=f"alert-shard-{shard}",
+            daemon=True
+        )
+        process.start()
+        return inbox, process
+
+    def check_workers(self):
+        """Restart workers that have died; raise once they keep dying"""
+        for shard, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+            if self.restarts >= SHARD_MAX_RESTARTS:
+                raise RuntimeError(
+                    f"Alert shard {shard} is down (exit code {process.exitcode}) "
+                    f"after {self.restarts} restarts"
+                )
+            self.restarts += 1
+            metrics.shard_restarts.inc()
+            logger.error("💀 Alert shard worker died - restarting", extra={
+                "shard": shard, "exitcode": process.exitcode, "restarts": self.restarts,
+            })
+            # Alerts it claimed but never settled would otherwise be taken as delivered
+            # on the next restart; give them back to its replacement
+            rearmed = alerts_repo.rearm_in_flight_for_shard(shard, self.num_shards)
+            if rearmed:
+                logger.warning("Re-armed alerts left in flight by the dead worker",
+                               extra={"shard": shard, "rearmed": len(rearmed)})
+            # A fresh inbox: the new worker loads its alerts from the database itself
+            self.inboxes[shard], self.processes[shard] = self._spawn(shard)
+            for row in rearmed:
+                alert_index.add(Alert(*row))
+
+    def _forward(self, event: str, alert: Alert):
+        self.inboxes[shard_for(alert.chat_id, self.num_shards)].put((event, tuple(alert)))
+
+    def _drain(self):
+        """Apply triggered/re-armed reports from the workers to this process's index"""
+        while True:
+            try:
+                event, payload = self.outbox.get_nowait()
+            except queue.Empty:
+                return
+            alert = Alert(*payload)
+            if event == "remove":
+                alert_index.remove(alert.id)
+            elif event == "add":
+                alert_index.add(alert)
+
+    def broadcast(self, prices: dict):
+        for inbox in self.inboxes:
+            inbox.put(("prices", prices))
+
+    def broadcast_price(self, chain: str, price: float) -> int:
+        """
+        Single-chain broadcast, used by the streaming evaluator. Returns 0: the
+        workers evaluate asynchronously and don't report counts back, so in
+        sharded mode StreamEvaluator.triggered stays 0.
+        """
+        self.check_workers()
+        self._drain()
+        self.broadcast({chain: price})
+        return 0
+
+    def run_cycle(self, chains=None) -> dict:
+        """Fetch one snapshot per active chain and hand it to every shard"""
+        started = time.perf_counter()
+        self.check_workers()
+        self._drain()
+        stats = {"requests": 0, "broadcast": 0, "failed_chains": {}}
+        active_chains = get_active_chains()
+        if chains is not None:
+            active_chains = [chain for chain in active_chains if chain in chains]
+        if not active_chains:
+            return stats
+        prices, failures, requests_made = fetch_chain_prices(active_chains)
+        for chain, error in failures.items():
+            logger.warning("API error", extra={"chain": chain, "error": error})
+        if prices:
+            self.broadcast(prices)
+        stats.update(requests=requests_made, broadcast=len(prices), failed_chains=failures)
+        metrics.alert_cycle_seconds.observe(time.perf_counter() - started)
+        return stats
+
+    def stop(self):
+        """
+        Stop the workers once they have sent what they queued, then apply their
+        last triggered/re-armed reports so this process's index is current.
+        """
+        for inbox in self.inboxes:
+            inbox.put(("stop", None))
+        for process in self.processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                logger.warning("Alert shard did not stop in time - terminating", extra={"worker": process.name})
+                process.terminate()
+        self._drain()
+        self.inboxes = []
+        self.processes = []
+
+
+shard_coordinator = ShardCoordinator()
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import json
+import time
+from config.api_keys import config
+from config.chains import chains as chain_registry
+from core.alert_manager import evaluate_chain
+from core.alert_index import alert_index
+from core.gas_cache import gas_cache, GasSnapshot
+from core.providers import JsonRpcProvider
+
+logger = logging.getLogger(__name__)
+
+# Websocket endpoints per chain id for streaming mode, e.g. "1=wss://ethereum-rpc.publicnode.com"
+WS_URLS = dict(
+    (int(chainid), url.strip())
+    for chainid, url in (item.split("=", 1) for item in (config.get("WS_URLS") or "").split(",") if "=" in item)
+)
+# Ignore updates that move the price by less than this fraction
+STREAM_MIN_CHANGE = float(config.get("STREAM_MIN_CHANGE") or 0.001)
+RECONNECT_DELAY = 5
+
+
+class PriceSource:
+    """Pushes gas snapshots as they happen. Subclasses implement updates()"""
+    name = "source"
+
+    async def updates(self):
+        """Async iterator of GasSnapshot"""
+        raise NotImplementedError
+        yield
+
+
+class WebsocketBlockSource(PriceSource):
+    """
+    Subscribes to newHeads on a node's websocket and, for every block, asks the
+    same node for eth_feeHistory. Each snapshot gets the tiers the RPC provider
+    uses (next base fee plus the 25th/50th/90th percentile priority fees), so
+    streamed prices compare with polled ones. Needs the optional `websockets` package.
+    """
+
+    def __init__(self, chainid: int, url: str):
+        self.chainid = chainid
+        self.url = url
+        self.name = f"ws:{chainid}"
+
+    async def updates(self):
+        try:
+            import websockets
+        except ImportError:
+            logger.warning("⚠️ Streaming mode needs the 'websockets' package (pip install websockets)")
+            return
+
+        while True:
+            try:
+                async with websockets.connect(self.url) as ws:
+                    await ws.send(json.dumps({
+                        "jsonrpc": "2.0", "id": "subscribe", "method": "eth_subscribe", "params": ["newHeads"]
+                    }))
+                    async for raw in ws:
+                        message = json.loads(raw)
+                        if message.get("method") == "eth_subscription":
+                            head = message.get("params", {}).get("result") or {}
+                            if head.get("baseFeePerGas") is not None:
+                                # The fee history answer (id 1) carries the tiers for this block
+                                await ws.send(json.dumps(JsonRpcProvider._payload()[0]))
+                        elif message.get("id") == 1:
+                            levels = JsonRpcProvider._parse([message])
+                            if "error" in levels:
+                                logger.warning("Fee history failed", extra={"source": self.name, "error": levels["error"]})
+                                continue
+                            yield GasSnapshot.from_gas_data(self.chainid, levels)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Stream disconnected - reconnecting",
+                               extra={"source": self.name, "error": str(e), "retry_in": RECONNECT_DELAY})
+                await asyncio.sleep(RECONNECT_DELAY)
+
+
+class FakeFeedSource(PriceSource):
+    """Local feed for tests: push(chainid, low[, medium, high]) and the snapshot is streamed"""
+    name = "fake"
+
+    def __init__(self):
+        self.queue = asyncio.Queue()
+
+    def push(self, chainid: int, low: float, medium: float = None, high: float = None):
+        medium = low if medium is None else medium
+        high = medium if high is None else high
+        self.queue.put_nowait(GasSnapshot(chainid, low, medium, high, time.time()))
+
+    async def updates(self):
+        while True:
+            yield await self.queue.get()
+
+
+class StreamEvaluator:
+    """
+    Evaluates armed alerts as soon as a source pushes a new price, instead of
+    waiting for the next poll. Updates that barely move the price are dropped.
+    Each accepted snapshot also refreshes the shared gas cache and its listeners
+    (history, render cache), so handlers and the polling fallback see it too.
+    """
+
+    def __init__(self, min_change: float = STREAM_MIN_CHANGE):
+        self.min_change = min_change
+        self._last = {}   # chainid -> last accepted price
+        self._tasks = []
+        # Evaluates one chain at one price (replaced in sharded mode, where it
+        # returns 0 and `triggered` is not counted here)
+        self.evaluate = evaluate_chain
+        self.received = 0
+        self.suppressed = 0
+        self.evaluations = 0
+        self.triggered = 0
+
+    def _changed(self, snapshot: GasSnapshot) -> bool:
+        last = self._last.get(snapshot.chainid)
+        price = snapshot.current
+        if last is not None and abs(price - last) <= self.min_change * last:
+            return False
+        self._last[snapshot.chainid] = price
+        return True
+
+    async def handle(self, snapshot: GasSnapshot):
+        self.received += 1
+        entry = chain_registry.by_id(snapshot.chainid)
+        if entry is None or not self._changed(snapshot):
+            self.suppressed += 1
+            return
+        chain = entry.key
+        gas_cache.push(snapshot)
+        if not alert_index.match(chain, snapshot.current):
+            return
+        self.evaluations += 1
+        # Claiming alerts writes to SQLite, so keep it off the event loop
+        self.triggered += await asyncio.to_thread(self.evaluate, chain, snapshot.current)
+
+    async def _consume(self, source: PriceSource):
+        async for snapshot in source.updates():
+            try:
+                await self.handle(snapshot)
+            except Exception:
+                logger.exception("Error evaluating streamed price", extra={"source": source.name})
+
+    def start(self, sources):
+        for source in sources:
+            self._tasks.append(asyncio.create_task(self._consume(source)))
+            logger.info("📡 Streaming prices", extra={"source": source.name})
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "suppressed": self.suppressed,
+            "evaluations": self.evaluations,
+            "triggered": self.triggered,
+        }
+
+
+def configured_sources():
+    return [WebsocketBlockSource(chainid, url) for chainid, url in WS_URLS.items()]
+
+
+stream_evaluator = StreamEvaluator()
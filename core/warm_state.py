@@ -0,0 +1,100 @@
+import json
+import logging
+import os
+import time
+from config.api_keys import config
+from core import metrics
+from core.alert_index import alert_index, Alert
+from core.gas_cache import gas_cache, GasSnapshot
+from data.repository import alerts_repo
+
+logger = logging.getLogger(__name__)
+
+# Where the last gas snapshots and the alert index are saved at shutdown
+WARM_STATE_PATH = config.get("WARM_STATE_PATH") or os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "warm_state.json"
+)
+
+_startup_seconds = metrics.Gauge("gasbot_startup_seconds", "Time from process start to each startup phase", ("phase",))
+
+
+def save_state(path: str = WARM_STATE_PATH, repo=alerts_repo) -> dict:
+    """
+    Write the cached gas snapshots and the armed alert index to disk.
+    Called at shutdown, after pending delivery results have been flushed and
+    any alert shards have stopped and reported back.
+    """
+    alerts = [list(alert) for alert in alert_index.alerts()]
+    state = {
+        "saved_at": time.time(),
+        "fingerprint": repo.armed_fingerprint(),
+        "snapshots": [
+            [s.chainid, s.low, s.medium, s.high, s.fetched_at]
+            for s in (gas_cache.peek(chainid) for chainid in gas_cache.chains())
+        ],
+        "alerts": alerts,
+        # What the saved list itself holds, checked against the database on load
+        "alerts_summary": [len(alerts), max((alert[0] for alert in alerts), default=0)],
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, separators=(",", ":"))
+    os.replace(tmp, path)
+    counts = {"snapshots": len(state["snapshots"]), "alerts": len(state["alerts"])}
+    logger.info("💾 Saved warm state", extra=counts)
+    return counts
+
+
+def load_state(path: str = WARM_STATE_PATH, repo=alerts_repo) -> dict:
+    """
+    Restore what save_state() wrote. Snapshots still within the cache's stale
+    window are put back (and served once while a refresh runs); the alert index
+    is only reused if the database hasn't changed since it was saved and the
+    saved alerts match the armed ones in it (same count and highest id).
+    The file is consumed, so a crash later on can't leave a stale copy behind.
+    Returns {"snapshots": n, "alerts": n or None if the index must be loaded from SQLite}.
+    """
+    result = {"snapshots": 0, "alerts": None}
+    try:
+        with open(path) as f:
+            state = json.load(f)
+        os.remove(path)
+    except FileNotFoundError:
+        return result
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable warm state", extra={"error": str(e)})
+        return result
+
+    for fields in state.get("snapshots", ()):
+        snapshot = GasSnapshot(*fields)
+        if snapshot.age < gas_cache.max_stale:
+            gas_cache.restore(snapshot)
+            result["snapshots"] += 1
+
+    if (state.get("fingerprint") == repo.armed_fingerprint()
+            and state.get("alerts_summary") == repo.armed_summary()):
+        alert_index.rebuild(Alert(*fields) for fields in state.get("alerts", ()))
+        result["alerts"] = len(alert_index)
+    else:
+        logger.info("Alerts changed since the warm state was saved - loading them from SQLite")
+    return result
+
+
+class StartupTimer:
+    """Records how long each startup phase took from process start"""
+
+    def __init__(self, started: float = None):
+        self.started = time.perf_counter() if started is None else started
+        self.phases = {}
+
+    def mark(self, phase: str) -> float:
+        elapsed = time.perf_counter() - self.started
+        self.phases[phase] = round(elapsed * 1000, 1)
+        _startup_seconds.set(elapsed, phase=phase)
+        return elapsed
+
+    def report(self):
+        logger.info("🚀 Startup timings (ms since start)", extra=self.phases)
+
+
+startup_timer = StartupTimer()
@@ -1,24 +1,201 @@
 from pathlib import Path
+import logging
 import sqlite3
+import threading
 import os
+from config.api_keys import config
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "alerts.db")
-
-def init_db():
-    print(f"Using DB path: {DB_PATH}")
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    print("db connection successful")
-    print("creating alerts table")
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS alerts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            chat_id INTEGER,
-            chain TEXT,
-            threshold REAL,
-            notified INTEGER DEFAULT 0
-        )
-    """)
-    conn.commit()
-    conn.close()
+logger = logging.getLogger(__name__)
+
+DB_PATH = config.get("ALERTS_DB_PATH") or os.path.join(os.path.dirname(__file__), "alerts.db")
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",
+)
+
+# Versioned schema migrations, applied in order. PRAGMA user_version records the
+# last one applied. Never edit an existing entry - append a new one instead.
+MIGRATIONS = [
+    # 1: initial schema
+    """
+    CREATE TABLE IF NOT EXISTS alerts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        chat_id INTEGER,
+        chain TEXT,
+        threshold REAL,
+        notified INTEGER DEFAULT 0
+    );
+    """,
+    # 2: indexes for the alert cycle and per-user lookups
+    """
+    CREATE INDEX IF NOT EXISTS idx_alerts_chain_notified_threshold
+        ON alerts (chain, notified, threshold);
+    CREATE INDEX IF NOT EXISTS idx_alerts_user_notified
+        ON alerts (user_id, notified);
+    """,
+    # 3: gas price history (raw samples plus 5-minute and hourly rollups)
+    """
+    CREATE TABLE IF NOT EXISTS gas_samples (
+        chainid INTEGER NOT NULL,
+        ts INTEGER NOT NULL,
+        low REAL,
+        medium REAL,
+        high REAL,
+        PRIMARY KEY (chainid, ts)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS gas_rollups (
+        chainid INTEGER NOT NULL,
+        resolution INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        total REAL NOT NULL,
+        low REAL NOT NULL,
+        high REAL NOT NULL,
+        hist BLOB NOT NULL,
+        PRIMARY KEY (chainid, resolution, bucket)
+    ) WITHOUT ROWID;
+    """,
+    # 4: alert counters for /stats, kept current by triggers on alerts
+    """
+    CREATE TABLE IF NOT EXISTS alert_stats (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS alert_chain_stats (
+        chain TEXT PRIMARY KEY,
+        count INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS alert_user_counts (
+        user_id INTEGER PRIMARY KEY,
+        count INTEGER NOT NULL
+    );
+
+    INSERT INTO alert_stats (name, value)
+        SELECT 'total', COUNT(*) FROM alerts
+        UNION ALL SELECT 'triggered', COUNT(*) FROM alerts WHERE notified != 0
+        UNION ALL SELECT 'users', COUNT(DISTINCT user_id) FROM alerts;
+    INSERT INTO alert_chain_stats (chain, count)
+        SELECT chain, COUNT(*) FROM alerts GROUP BY chain;
+    INSERT INTO alert_user_counts (user_id, count)
+        SELECT user_id, COUNT(*) FROM alerts GROUP BY user_id;
+
+    CREATE TRIGGER IF NOT EXISTS alerts_stats_insert AFTER INSERT ON alerts BEGIN
+        UPDATE alert_stats SET value = value + 1 WHERE name = 'total';
+        UPDATE alert_stats SET value = value + 1 WHERE name = 'triggered' AND NEW.notified != 0;
+        INSERT INTO alert_chain_stats (chain, count) VALUES (NEW.chain, 1)
+            ON CONFLICT (chain) DO UPDATE SET count = count + 1;
+        INSERT INTO alert_user_counts (user_id, count) VALUES (NEW.user_id, 1)
+            ON CONFLICT (user_id) DO UPDATE SET count = count + 1;
+        UPDATE alert_stats SET value = value + 1 WHERE name = 'users'
+            AND (SELECT count FROM alert_user_counts WHERE user_id = NEW.user_id) = 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS alerts_stats_delete AFTER DELETE ON alerts BEGIN
+        UPDATE alert_stats SET value = value - 1 WHERE name = 'total';
+        UPDATE alert_stats SET value = value - 1 WHERE name = 'triggered' AND OLD.notified != 0;
+        UPDATE alert_chain_stats SET count = count - 1 WHERE chain = OLD.chain;
+        DELETE FROM alert_chain_stats WHERE chain = OLD.chain AND count = 0;
+        UPDATE alert_user_counts SET count = count - 1 WHERE user_id = OLD.user_id;
+        UPDATE alert_stats SET value = value - 1 WHERE name = 'users'
+            AND (SELECT count FROM alert_user_counts WHERE user_id = OLD.user_id) = 0;
+        DELETE FROM alert_user_counts WHERE user_id = OLD.user_id AND count = 0;
+    END;
+    CREATE TRIGGER IF NOT EXISTS alerts_stats_notified AFTER UPDATE OF notified ON alerts
+    WHEN (OLD.notified != 0) != (NEW.notified != 0) BEGIN
+        UPDATE alert_stats SET value = value + (CASE WHEN NEW.notified != 0 THEN 1 ELSE -1 END)
+            WHERE name = 'triggered';
+    END;
+    """,
+    # 5: cold storage for delivered and deleted alerts. Archived triggered alerts
+    # still count in /stats, so archiving one moves its counts rather than dropping them.
+    """
+    CREATE TABLE IF NOT EXISTS alerts_archive (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        chat_id INTEGER,
+        chain TEXT,
+        threshold REAL,
+        notified INTEGER,
+        reason TEXT NOT NULL,
+        archived_at INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_alerts_archive_archived_at ON alerts_archive (archived_at);
+
+    CREATE TRIGGER IF NOT EXISTS alerts_archive_stats_insert AFTER INSERT ON alerts_archive
+    WHEN NEW.reason = 'triggered' BEGIN
+        UPDATE alert_stats SET value = value + 1 WHERE name IN ('total', 'triggered');
+        INSERT INTO alert_chain_stats (chain, count) VALUES (NEW.chain, 1)
+            ON CONFLICT (chain) DO UPDATE SET count = count + 1;
+        INSERT INTO alert_user_counts (user_id, count) VALUES (NEW.user_id, 1)
+            ON CONFLICT (user_id) DO UPDATE SET count = count + 1;
+        UPDATE alert_stats SET value = value + 1 WHERE name = 'users'
+            AND (SELECT count FROM alert_user_counts WHERE user_id = NEW.user_id) = 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS alerts_archive_stats_delete AFTER DELETE ON alerts_archive
+    WHEN OLD.reason = 'triggered' BEGIN
+        UPDATE alert_stats SET value = value - 1 WHERE name IN ('total', 'triggered');
+        UPDATE alert_chain_stats SET count = count - 1 WHERE chain = OLD.chain;
+        DELETE FROM alert_chain_stats WHERE chain = OLD.chain AND count = 0;
+        UPDATE alert_user_counts SET count = count - 1 WHERE user_id = OLD.user_id;
+        UPDATE alert_stats SET value = value - 1 WHERE name = 'users'
+            AND (SELECT count FROM alert_user_counts WHERE user_id = OLD.user_id) = 0;
+        DELETE FROM alert_user_counts WHERE user_id = OLD.user_id AND count = 0;
+    END;
+    """,
+]
+
+_local = threading.local()
+
+def get_connection(db_path: str = DB_PATH) -> sqlite3.Connection:
+    """
+    Return this thread's long-lived connection to the database.
+    WAL mode lets the handler threads read while the alert cycle writes.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        connections[db_path] = conn
+    return conn
+
+def close_connection(db_path: str = DB_PATH):
+    """Close this thread's connection, if any"""
+    connections = getattr(_local, "connections", {})
+    conn = connections.pop(db_path, None)
+    if conn is not None:
+        conn.close()
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply pending migrations and return the resulting schema version"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+        logger.info("Applying schema migration", extra={"migration": number})
+        conn.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {number};\nCOMMIT;")
+    return len(MIGRATIONS)
+
+def enable_incremental_vacuum(conn: sqlite3.Connection):
+    """
+    Switch the database to auto_vacuum = INCREMENTAL so pages freed by archiving
+    can be returned with PRAGMA incremental_vacuum. Changing the mode of an
+    existing database takes a full VACUUM (outside any transaction), done once.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return
+    logger.info("Enabling incremental auto-vacuum (one-off VACUUM)")
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+
+def init_db(db_path: str = DB_PATH):
+    logger.info("Using DB path", extra={"db_path": db_path})
+    conn = get_connection(db_path)
+    version = migrate(conn)
+    enable_incremental_vacuum(conn)
+    logger.info("Schema ready", extra={"schema_version": version})
@@ -0,0 +1,241 @@
+import logging
+import math
+import queue
+import threading
+import time
+from array import array
+from core import metrics
+from core.metrics import timed_query
+from data.db import DB_PATH, get_connection
+
+RAW_RETENTION = 24 * 3600            # raw samples kept for 24 h
+ROLLUP_RESOLUTIONS = {
+    300: 30 * 24 * 3600,             # 5-minute rollups kept for 30 days
+    3600: 365 * 24 * 3600,           # hourly rollups kept for a year
+}
+PRUNE_INTERVAL = 3600
+# Samples waiting for the writer thread; beyond this new ones are dropped
+WRITE_QUEUE_SIZE = 10000
+
+logger = logging.getLogger(__name__)
+
+# Log-spaced histogram bins (~12% wide) from 0.01 to ~10,000 Gwei, used for percentiles
+HIST_MIN = 0.01
+HIST_RATIO = 1.25
+HIST_BINS = 64
+
+def _bin(price: float) -> int:
+    if price <= HIST_MIN:
+        return 0
+    return min(HIST_BINS - 1, int(math.log(price / HIST_MIN) / math.log(HIST_RATIO)))
+
+def _bin_value(i: int) -> float:
+    """Geometric midpoint of a histogram bin"""
+    return HIST_MIN * HIST_RATIO ** (i + 0.5)
+
+def parse_window(text: str) -> int:
+    """Parse a window like '90m', '24h' or '7d' into seconds"""
+    units = {"m": 60, "h": 3600, "d": 86400}
+    text = text.strip().lower()
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(float(text) * 3600)
+
+
+class _Rollup:
+    __slots__ = ("bucket", "count", "total", "low", "high", "hist")
+
+    def __init__(self, bucket, count=0, total=0.0, low=math.inf, high=-math.inf, hist=None):
+        self.bucket = bucket
+        self.count = count
+        self.total = total
+        self.low = low
+        self.high = high
+        self.hist = hist if hist is not None else array("I", bytes(4 * HIST_BINS))
+
+    def add(self, price: float):
+        self.count += 1
+        self.total += price
+        self.low = min(self.low, price)
+        self.high = max(self.high, price)
+        self.hist[_bin(price)] += 1
+
+
+class GasHistory:
+    """
+    Time-series store for gas snapshots.
+    Raw samples are appended to gas_samples; 5-minute and hourly rollups
+    (count/sum/min/max plus a small histogram) are updated incrementally on
+    every sample, so queries never rescan raw rows. Old data is pruned per
+    resolution so storage stays bounded.
+
+    submit() is the gas cache listener: it only queues the snapshot, and a
+    writer thread stores queued samples in batches, so fetches made on the
+    bot's event loop never wait on SQLite.
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._open = {}   # (chainid, resolution) -> _Rollup for the current bucket
+        self._last_prune = 0.0
+        self._queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._thread = None
+        self.dropped = 0  # samples dropped because the writer fell behind
+
+    @property
+    def conn(self):
+        return get_connection(self.db_path)
+
+    def submit(self, snapshot):
+        """Queue a snapshot for the writer thread. Never blocks"""
+        try:
+            self._queue.put_nowait(snapshot)
+        except queue.Full:
+            self.dropped += 1
+            metrics.gas_history_dropped.inc()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="gas-history-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the writer thread after it has stored everything queued so far"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 500:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is None
+            try:
+                self.record_many(snapshot for snapshot in batch if snapshot is not None)
+            except Exception:
+                logger.exception("Error recording gas history")
+            if stopping:
+                return
+
+    def record(self, snapshot):
+        """Store one snapshot and fold it into the rollups"""
+        self.record_many([snapshot])
+
+    @timed_query("gas_history_record")
+    def record_many(self, snapshots):
+        """Store snapshots in one transaction and fold them into the rollups"""
+        with self._lock:
+            conn = self.conn
+            with conn:
+                for snapshot in snapshots:
+                    self._record(conn, snapshot)
+            if time.time() - self._last_prune > PRUNE_INTERVAL:
+                self.prune()
+
+    def _record(self, conn, snapshot):
+        ts = int(snapshot.fetched_at)
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO gas_samples (chainid, ts, low, medium, high) VALUES (?, ?, ?, ?, ?)",
+            (snapshot.chainid, ts, snapshot.low, snapshot.medium, snapshot.high)
+        )
+        if not cursor.rowcount:
+            # Already have a sample for this second; the rollups counted it
+            return
+        price = snapshot.current
+        for resolution in ROLLUP_RESOLUTIONS:
+            rollup = self._current_rollup(conn, snapshot.chainid, resolution, ts - ts % resolution)
+            rollup.add(price)
+            conn.execute("""
+                INSERT OR REPLACE INTO gas_rollups
+                    (chainid, resolution, bucket, count, total, low, high, hist)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (snapshot.chainid, resolution, rollup.bucket, rollup.count, rollup.total,
+                  rollup.low, rollup.high, rollup.hist.tobytes()))
+
+    def _current_rollup(self, conn, chainid: int, resolution: int, bucket: int) -> _Rollup:
+        rollup = self._open.get((chainid, resolution))
+        if rollup is None or rollup.bucket != bucket:
+            # Continue a bucket written before a restart rather than overwriting it
+            row = conn.execute("""
+                SELECT count, total, low, high, hist FROM gas_rollups
+                WHERE chainid = ? AND resolution = ? AND bucket = ?
+            """, (chainid, resolution, bucket)).fetchone()
+            if row:
+                rollup = _Rollup(bucket, row[0], row[1], row[2], row[3], array("I", row[4]))
+            else:
+                rollup = _Rollup(bucket)
+            self._open[(chainid, resolution)] = rollup
+        return rollup
+
+    @timed_query("gas_history_prune")
+    def prune(self, now: float = None):
+        """Drop raw samples and rollups older than their retention"""
+        now = now or time.time()
+        with self.conn as conn:
+            conn.execute("DELETE FROM gas_samples WHERE ts < ?", (now - RAW_RETENTION,))
+            for resolution, retention in ROLLUP_RESOLUTIONS.items():
+                conn.execute(
+                    "DELETE FROM gas_rollups WHERE resolution = ? AND bucket < ?",
+                    (resolution, now - retention)
+                )
+        self._last_prune = now
+
+    @timed_query("gas_history_summary")
+    def summary(self, chainid: int, window: int, now: float = None):
+        """
+        min/avg/max and percentiles of the current gas price over the last
+        `window` seconds, computed from rollups. Returns None when there is no data.
+        """
+        now = now or time.time()
+        # Finer rollups for short windows, hourly ones beyond two days
+        resolution = 300 if window <= 2 * 86400 else 3600
+        rows = self.conn.execute("""
+            SELECT count, total, low, high, hist FROM gas_rollups
+            WHERE chainid = ? AND resolution = ? AND bucket >= ?
+        """, (chainid, resolution, now - window - (now % resolution))).fetchall()
+        if not rows:
+            return None
+
+        count = 0
+        total = 0.0
+        low = math.inf
+        high = -math.inf
+        hist = [0] * HIST_BINS
+        for row_count, row_total, row_low, row_high, row_hist in rows:
+            count += row_count
+            total += row_total
+            low = min(low, row_low)
+            high = max(high, row_high)
+            for i, n in enumerate(array("I", row_hist)):
+                if n:
+                    hist[i] += n
+
+        def percentile(p):
+            target = p * count
+            seen = 0
+            for i, n in enumerate(hist):
+                seen += n
+                if n and seen >= target:
+                    return min(high, max(low, _bin_value(i)))
+            return high
+
+        return {
+            "samples": count,
+            "min": low,
+            "avg": total / count,
+            "max": high,
+            "p50": percentile(0.50),
+            "p90": percentile(0.90),
+            "p99": percentile(0.99),
+            "resolution": resolution,
+        }
+
+
+gas_history = GasHistory()
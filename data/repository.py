@@ -0,0 +1,261 @@
+import asyncio
+import time
+from core import metrics
+from core.metrics import timed_query
+from data.db import DB_PATH, get_connection
+
+# Values of alerts.notified
+ARMED = 0
+DELIVERED = 1
+IN_FLIGHT = 2  # claimed by an alert cycle, delivery not yet confirmed
+
+
+class AlertRepository:
+    """
+    Every read and write of the alerts table goes through here.
+    The *_async methods run the query in a worker thread so bot handlers
+    never do blocking disk I/O on the event loop.
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+
+    @property
+    def conn(self):
+        return get_connection(self.db_path)
+
+    @timed_query("add_alert")
+    def add_alert(self, user_id: int, chat_id: int, chain: str, threshold: float) -> int:
+        with self.conn as conn:
+            cursor = conn.execute("""
+                INSERT INTO alerts (user_id, chat_id, chain, threshold, notified)
+                VALUES (?, ?, ?, ?, 0)
+            """, (user_id, chat_id, chain, threshold))
+        return cursor.lastrowid
+
+    @timed_query("delete_alert")
+    def delete_alert(self, alert_id: int, user_id: int) -> bool:
+        """
+        Delete an armed alert owned by the user, moving it to the archive.
+        Returns False if nothing was deleted.
+        """
+        with self.conn as conn:
+            conn.execute("""
+                INSERT INTO alerts_archive (id, user_id, chat_id, chain, threshold, notified, reason, archived_at)
+                SELECT id, user_id, chat_id, chain, threshold, notified, 'deleted', ?
+                FROM alerts
+                WHERE id = ? AND user_id = ? AND notified = 0
+            """, (int(time.time()), alert_id, user_id))
+            cursor = conn.execute("""
+                DELETE FROM alerts
+                WHERE id = ? AND user_id = ? AND notified = 0
+            """, (alert_id, user_id))
+        return cursor.rowcount > 0
+
+    @timed_query("get_user_alerts")
+    def get_user_alerts(self, user_id: int):
+        """Armed alerts for a user as (id, chain, threshold, notified) rows"""
+        return self.conn.execute("""
+            SELECT id, chain, threshold, notified
+            FROM alerts
+            WHERE user_id = ? AND notified = 0
+            ORDER BY chain, threshold
+        """, (user_id,)).fetchall()
+
+    @timed_query("get_armed_alerts")
+    def get_armed_alerts(self):
+        """All armed alerts as (id, user_id, chat_id, chain, threshold) rows"""
+        return self.conn.execute(
+            "SELECT id, user_id, chat_id, chain, threshold FROM alerts WHERE notified = 0"
+        ).fetchall()
+
+    @timed_query("get_armed_alerts_for_shard")
+    def get_armed_alerts_for_shard(self, shard: int, num_shards: int):
+        """Armed alerts owned by one shard (partitioned by chat id)"""
+        return self.conn.execute("""
+            SELECT id, user_id, chat_id, chain, threshold FROM alerts
+            WHERE notified = 0 AND abs(chat_id) % ? = ?
+        """, (num_shards, shard)).fetchall()
+
+    @timed_query("set_notified")
+    def set_notified(self, alert_ids, state: int = DELIVERED, only_from: int = None) -> int:
+        """
+        Set the notified state of many alerts in one transaction.
+        When only_from is given, only alerts currently in that state are changed.
+        Returns the number of rows updated.
+        """
+        if only_from is None:
+            sql, params = "UPDATE alerts SET notified = ? WHERE id = ?", [(state, i) for i in alert_ids]
+        else:
+            sql = "UPDATE alerts SET notified = ? WHERE id = ? AND notified = ?"
+            params = [(state, i, only_from) for i in alert_ids]
+        if not params:
+            return 0
+        with self.conn as conn:
+            cursor = conn.executemany(sql, params)
+        return cursor.rowcount
+
+    @timed_query("claim_alerts")
+    def claim_alerts(self, alert_ids) -> set:
+        """
+        Mark triggered alerts in flight before their messages are sent.
+        Returns the ids actually claimed: alerts already delivered, in flight or
+        deleted meanwhile are left alone and must not be sent.
+        """
+        alert_ids = list(alert_ids)
+        claimed = set()
+        with self.conn as conn:
+            for start in range(0, len(alert_ids), 500):
+                chunk = alert_ids[start:start + 500]
+                claimed.update(row[0] for row in conn.execute(f"""
+                    UPDATE alerts SET notified = ? WHERE notified = ? AND id IN ({",".join("?" * len(chunk))})
+                    RETURNING id
+                """, (IN_FLIGHT, ARMED, *chunk)))
+        return claimed
+
+    @timed_query("rearm_in_flight_for_shard")
+    def rearm_in_flight_for_shard(self, shard: int, num_shards: int) -> list:
+        """
+        Re-arm the alerts a dead shard worker had claimed but not settled, so its
+        replacement sends them. Returns the re-armed rows like get_armed_alerts.
+        """
+        with self.conn as conn:
+            return conn.execute("""
+                UPDATE alerts SET notified = ? WHERE notified = ? AND abs(chat_id) % ? = ?
+                RETURNING id, user_id, chat_id, chain, threshold
+            """, (ARMED, IN_FLIGHT, num_shards, shard)).fetchall()
+
+    @timed_query("recover_in_flight")
+    def recover_in_flight(self) -> int:
+        """
+        Settle alerts left in flight by a crash. They may already have been
+        delivered, so they are treated as delivered rather than sent again.
+        A clean shutdown re-arms everything it did not send, so it leaves none.
+        """
+        with self.conn as conn:
+            cursor = conn.execute(
+                "UPDATE alerts SET notified = ? WHERE notified = ?", (DELIVERED, IN_FLIGHT)
+            )
+        return cursor.rowcount
+
+    @timed_query("archive_delivered")
+    def archive_delivered(self, limit: int) -> int:
+        """Move up to limit delivered alerts to the archive in one transaction. Returns how many moved"""
+        conn = self.conn
+        ids = [(row[0],) for row in conn.execute(
+            "SELECT id FROM alerts WHERE notified = ? LIMIT ?", (DELIVERED, limit)
+        )]
+        if not ids:
+            return 0
+        now = int(time.time())
+        with conn:
+            conn.executemany("""
+                INSERT INTO alerts_archive (id, user_id, chat_id, chain, threshold, notified, reason, archived_at)
+                SELECT id, user_id, chat_id, chain, threshold, notified, 'triggered', ?
+                FROM alerts WHERE id = ? AND notified = ?
+            """, [(now, alert_id, DELIVERED) for alert_id, in ids])
+            conn.executemany("DELETE FROM alerts WHERE id = ? AND notified = ?",
+                             [(alert_id, DELIVERED) for alert_id, in ids])
+        return len(ids)
+
+    @timed_query("purge_archive")
+    def purge_archive(self, before: float, limit: int) -> int:
+        """Drop up to limit archived alerts archived before the given time"""
+        with self.conn as conn:
+            cursor = conn.execute("""
+                DELETE FROM alerts_archive WHERE id IN (
+                    SELECT id FROM alerts_archive WHERE archived_at < ? LIMIT ?
+                )
+            """, (int(before), limit))
+        return cursor.rowcount
+
+    @timed_query("incremental_vacuum")
+    def incremental_vacuum(self, pages: int) -> int:
+        """Return up to pages free pages to the filesystem. Returns the free pages left"""
+        conn = self.conn
+        conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+        return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    @timed_query("armed_fingerprint")
+    def armed_fingerprint(self) -> list:
+        """
+        Cheap identity of the set of armed alerts: the last alert id handed out
+        and the number armed, both read from counters rather than the table.
+        Any add bumps the first; any delete, trigger or re-arm moves the second.
+        """
+        conn = self.conn
+        seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'alerts'").fetchone()
+        counters = dict(conn.execute("SELECT name, value FROM alert_stats").fetchall())
+        return [seq[0] if seq else 0, counters.get("total", 0) - counters.get("triggered", 0)]
+
+    @timed_query("armed_summary")
+    def armed_summary(self) -> list:
+        """[count, max id] of the armed alerts, to check a saved copy of them against"""
+        count, max_id = self.conn.execute(
+            "SELECT count(*), coalesce(max(id), 0) FROM alerts WHERE notified = ?", (ARMED,)
+        ).fetchone()
+        return [count, max_id]
+
+    @timed_query("get_stats")
+    def get_stats(self) -> dict:
+        """
+        Alert counters for /stats. Read from the small counter tables that
+        triggers on alerts keep current, so the cost doesn't grow with the table.
+        """
+        conn = self.conn
+        counters = dict(conn.execute("SELECT name, value FROM alert_stats").fetchall())
+        return {
+            "users": counters.get("users", 0),
+            "total": counters.get("total", 0),
+            "triggered": counters.get("triggered", 0),
+            "by_chain": conn.execute("SELECT chain, count FROM alert_chain_stats ORDER BY chain").fetchall(),
+        }
+
+    @timed_query("reconcile_stats")
+    def reconcile_stats(self) -> dict:
+        """Recompute every counter from the alerts table. Returns the counters that were off"""
+        before = self.get_stats()
+        with self.conn as conn:
+            conn.execute("DELETE FROM alert_stats")
+            conn.execute("DELETE FROM alert_chain_stats")
+            conn.execute("DELETE FROM alert_user_counts")
+            # Counted alerts: everything in the hot table plus archived triggered ones
+            counted = """
+                SELECT user_id, chain, notified FROM alerts
+                UNION ALL
+                SELECT user_id, chain, notified FROM alerts_archive WHERE reason = 'triggered'
+            """
+            conn.execute(f"""
+                INSERT INTO alert_stats (name, value)
+                    SELECT 'total', COUNT(*) FROM ({counted})
+                    UNION ALL SELECT 'triggered', COUNT(*) FROM ({counted}) WHERE notified != 0
+                    UNION ALL SELECT 'users', COUNT(DISTINCT user_id) FROM ({counted})
+            """)
+            conn.execute(f"INSERT INTO alert_chain_stats (chain, count) SELECT chain, COUNT(*) FROM ({counted}) GROUP BY chain")
+            conn.execute(f"INSERT INTO alert_user_counts (user_id, count) SELECT user_id, COUNT(*) FROM ({counted}) GROUP BY user_id")
+        after = self.get_stats()
+        return {name: (before[name], after[name]) for name in after if before[name] != after[name]}
+
+    async def add_alert_async(self, user_id: int, chat_id: int, chain: str, threshold: float) -> int:
+        return await asyncio.to_thread(self.add_alert, user_id, chat_id, chain, threshold)
+
+    async def delete_alert_async(self, alert_id: int, user_id: int) -> bool:
+        return await asyncio.to_thread(self.delete_alert, alert_id, user_id)
+
+    async def get_user_alerts_async(self, user_id: int):
+        return await asyncio.to_thread(self.get_user_alerts, user_id)
+
+    async def get_stats_async(self) -> dict:
+        return await asyncio.to_thread(self.get_stats)
+
+    async def reconcile_stats_async(self) -> dict:
+        return await asyncio.to_thread(self.reconcile_stats)
+
+
+alerts_repo = AlertRepository()
+
+metrics.Gauge("gasbot_alerts", "Alerts ever created and not deleted", function=lambda: alerts_repo.get_stats()["total"])
+metrics.Gauge("gasbot_alerts_triggered", "Alerts that have fired", function=lambda: alerts_repo.get_stats()["triggered"])
+metrics.Gauge("gasbot_alert_users", "Distinct users with alerts", function=lambda: alerts_repo.get_stats()["users"])
+metrics.Gauge("gasbot_alerts_by_chain", "Alerts per chain", ("chain",),
+              function=lambda: dict(alerts_repo.get_stats()["by_chain"]))
@@ -1,33 +1,106 @@
-from bot.bot_init import bot
-from data.db import init_db
-from core.scheduler import start_scheduler
-import threading
 import time
 
-def start_scheduler_delayed():
-    """Start the scheduler after a short delay to ensure the bot is running"""
-    time.sleep(2)  # Wait for bot to start
-    start_scheduler(bot)
+# Startup is timed from here, before the heavy imports below
+PROCESS_STARTED = time.perf_counter()
+
+from bot.bot_init import bot, MAX_CONCURRENT_UPDATES
+from config.api_keys import config
+from data.db import init_db
+from core.alert_index import alert_index
+from data.repository import alerts_repo
+from data.history import gas_history
+from core.gas_cache import gas_cache
+from core.scheduler import poller
+from core.sharding import shard_coordinator
+from core.stream import stream_evaluator
+from core.warm_state import load_state, startup_timer
+from core.log import setup_logging
+from core import metrics
+import argparse
+import logging
+
+logger = logging.getLogger(__name__)
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-Chain Gas Fee Tracker Bot")
+    parser.add_argument("--webhook", action="store_true",
+                        help="receive updates through a webhook instead of long polling")
+    parser.add_argument("--listen", default=config.get("WEBHOOK_LISTEN") or "0.0.0.0",
+                        help="address the webhook server listens on")
+    parser.add_argument("--port", type=int, default=int(config.get("WEBHOOK_PORT") or 8443),
+                        help="port the webhook server listens on")
+    parser.add_argument("--url", default=config.get("WEBHOOK_URL"),
+                        help="public base URL Telegram sends updates to")
+    parser.add_argument("--path", default=config.get("WEBHOOK_PATH") or "telegram",
+                        help="URL path of the webhook endpoint")
+    parser.add_argument("--secret", default=config.get("WEBHOOK_SECRET"),
+                        help="secret token Telegram must send with every update")
+    return parser.parse_args(argv)
+
+def run_webhook(args):
+    if not args.url:
+        raise SystemExit("❌ --webhook needs a public URL (--url or WEBHOOK_URL)")
+    webhook_url = f"{args.url.rstrip('/')}/{args.path}"
+    logger.info("🌐 Listening for webhook updates", extra={"listen": args.listen, "port": args.port, "path": args.path})
+    bot.run_webhook(
+        listen=args.listen,
+        port=args.port,
+        url_path=args.path,
+        webhook_url=webhook_url,
+        secret_token=args.secret,
+        max_connections=min(100, MAX_CONCURRENT_UPDATES),
+    )
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging()
+    startup_timer.started = PROCESS_STARTED
+    startup_timer.mark("imports")
     try:
-        print("🚀 Starting Cross-Chain Gas Fee Tracker Bot...")
+        logger.info("🚀 Starting Cross-Chain Gas Fee Tracker Bot...")
         init_db()
-        print("✅ Database initialized")
+        startup_timer.mark("database")
+        logger.info("✅ Database initialized")
+        gas_cache.listeners.append(gas_history.submit)
+        gas_history.start()
+        recovered = alerts_repo.recover_in_flight()
+        if recovered:
+            logger.warning("⚠️ Alerts were left in flight by a crash - treating them as delivered",
+                           extra={"recovered": recovered})
+        warm = load_state()
+        if warm["alerts"] is None:
+            alert_index.load()
+        startup_timer.mark("alert_index")
+        logger.info("✅ Alert index loaded", extra={
+            "armed_alerts": len(alert_index),
+            "from_warm_state": warm["alerts"] is not None,
+            "restored_snapshots": warm["snapshots"],
+        })
+        
+        if shard_coordinator.enabled:
+            shard_coordinator.start()
+            poller.cycle = shard_coordinator.run_cycle
+            stream_evaluator.evaluate = shard_coordinator.broadcast_price
         
-        print("⏰ Starting background scheduler...")
-        scheduler_thread = threading.Thread(target=start_scheduler_delayed, daemon=True)
-        scheduler_thread.start()
+        if metrics.METRICS_ENABLED:
+            metrics.start_metrics_server()
+            logger.info("📊 Serving metrics", extra={"port": metrics.METRICS_PORT})
         
-        print("🤖 Starting Telegram bot...")
-        print("🎯 Bot is now running! Press Ctrl+C to stop.")
-        bot.run_polling()
+        logger.info("🤖 Starting Telegram bot...")
+        logger.info("🎯 Bot is now running! Press Ctrl+C to stop.")
+        if args.webhook:
+            run_webhook(args)
+        else:
+            bot.run_polling()
         
     except KeyboardInterrupt:
-        print("\n🛑 Bot stopped by user")
+        logger.info("🛑 Bot stopped by user")
     except Exception as e:
-        print(f"❌ Error starting bot: {e}")
+        logger.exception("❌ Error starting bot")
         raise
+    finally:
+        if shard_coordinator.processes:
+            shard_coordinator.stop()
 
 if __name__ == "__main__":
     main()